@@ -0,0 +1,30 @@
+"""Use server-side defaults for algorithms.updated_at and positions.last_updated
+
+Revision ID: 5f2c8d1a9b3e
+Revises: 1748660eab65
+Create Date: 2026-10-16 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2c8d1a9b3e'
+down_revision = '1748660eab65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('algorithms') as batch_op:
+        batch_op.alter_column('updated_at', type_=sa.DateTime(timezone=True), server_default=sa.func.now())
+    with op.batch_alter_table('positions') as batch_op:
+        batch_op.alter_column('last_updated', type_=sa.DateTime(timezone=True), server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('positions') as batch_op:
+        batch_op.alter_column('last_updated', type_=sa.DateTime(), server_default=None)
+    with op.batch_alter_table('algorithms') as batch_op:
+        batch_op.alter_column('updated_at', type_=sa.DateTime(), server_default=None)
@@ -0,0 +1,30 @@
+"""Index the columns DatabaseService filters on
+
+Revision ID: 9c4e7b2d6a18
+Revises: 5f2c8d1a9b3e
+Create Date: 2026-10-16 11:40:07.512893
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e7b2d6a18'
+down_revision = '5f2c8d1a9b3e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_signals_algorithm_id'), 'signals', ['algorithm_id'], unique=False)
+    op.create_index(op.f('ix_positions_status'), 'positions', ['status'], unique=False)
+    op.create_index(op.f('ix_trades_signal_id'), 'trades', ['signal_id'], unique=False)
+    op.create_index(op.f('ix_trades_position_id'), 'trades', ['position_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_trades_position_id'), table_name='trades')
+    op.drop_index(op.f('ix_trades_signal_id'), table_name='trades')
+    op.drop_index(op.f('ix_positions_status'), table_name='positions')
+    op.drop_index(op.f('ix_signals_algorithm_id'), table_name='signals')
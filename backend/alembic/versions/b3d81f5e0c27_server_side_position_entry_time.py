@@ -0,0 +1,26 @@
+"""Use a server-side default for positions.entry_time
+
+Revision ID: b3d81f5e0c27
+Revises: 9c4e7b2d6a18
+Create Date: 2026-10-16 12:25:53.774310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d81f5e0c27'
+down_revision = '9c4e7b2d6a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('positions') as batch_op:
+        batch_op.alter_column('entry_time', existing_type=sa.DateTime(), server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('positions') as batch_op:
+        batch_op.alter_column('entry_time', existing_type=sa.DateTime(), server_default=None)
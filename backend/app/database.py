@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 # Remove unused column/type imports if models are removed
 # from sqlalchemy import Column, String, Float, DateTime, Enum, Boolean, ForeignKey
@@ -24,8 +24,31 @@ print(f"--- Using database at: {SQLALCHEMY_DATABASE_URL} ---")
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False} # Keep check_same_thread for SQLite
+    connect_args={
+        "check_same_thread": False, # Keep check_same_thread for SQLite
+        "cached_statements": 1024 # Reuse prepared statements instead of re-parsing per insert
+    },
+    query_cache_size=1024, # Larger compiled-SQL cache for the repeated signal/trade statements
+    # Enough pooled connections for request threads plus the trading loop's worker
+    # threads, so connections (and their page caches) are reused rather than reopened
+    pool_size=10,
+    max_overflow=20
 )
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers and backups run alongside the trading loop's writes;
+        # under WAL, synchronous=NORMAL only fsyncs at checkpoints, not every commit
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA wal_autocheckpoint=1000")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache per connection
+        cursor.execute("PRAGMA mmap_size=268435456")  # Read pages through a 256 MiB memory map
+        cursor.close()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Remove Base definition - it's imported now
@@ -38,20 +61,13 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # class Signal(Base): ...
 
 def get_db():
-    print("--- Entering get_db ---")
+    """Request-scoped session. Closing it when the request ends (also on errors)
+    rolls back anything uncommitted and drops its identity map."""
     db = SessionLocal()
-    print("--- SessionLocal() created db object ---")
     try:
-        print("--- Yielding db from get_db ---")
         yield db
-        print("--- Returned from yield in get_db ---")
-    except Exception as e:
-        print(f"!!! Exception in get_db try block: {e}")
-        raise # Re-raise the exception
     finally:
-        print("--- Closing db in get_db finally block ---")
         db.close()
-        print("--- db closed in get_db finally block ---")
 
 # Remove init_db from here, it belongs in its own script (e.g., app/init_db.py)
 # def init_db():
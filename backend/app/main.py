@@ -5,36 +5,44 @@ from typing import List, Optional, Dict, Any
 import numpy as np
 from numba import njit
 from datetime import datetime, timedelta, timezone
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from jose import JWTError
 from sqlalchemy.orm import Session
 import os
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import JSONResponse
 from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 import time
+import asyncio
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
 
 from .database import get_db, Base, SessionLocal
 from .models import User, Trade, Algorithm, Position, PositionStatus, TradeStatus, Signal, AlgorithmType, SignalType, TradeType
 from .services.alpaca_service import AlpacaService
 from .services.algorithm_service import AlgorithmService
 from .services.automated_trading_service import AutomatedTradingService
-from .services.auth_service import AuthService
+from .services.auth_service import AuthService, decode_access_token, get_user_by_email, SECRET_KEY as AUTH_SECRET_KEY, ALGORITHM as AUTH_ALGORITHM
 from .services.data_service import DataService
 from .services.backup_service import BackupService
+from .services.rate_limiter import TokenBucketLimiter
 
 load_dotenv()
 
+# Load standard Alpaca config from environment
+# Recommended names: APCA_API_KEY_ID, APCA_API_SECRET_KEY
+APCA_API_KEY_ID = os.getenv("APCA_API_KEY_ID") 
+APCA_API_SECRET_KEY = os.getenv("APCA_API_SECRET_KEY")
+PAPER_TRADING = os.getenv("PAPER_TRADING", "true").lower() == "true"
+
 # --- Initialize Services (Singletons) ---
 # This block MUST come before the dependency injectors below
 try:
-    GLOBAL_ALPACA_SERVICE = AlpacaService() 
+    GLOBAL_ALPACA_SERVICE = AlpacaService(paper=PAPER_TRADING)
     GLOBAL_DATA_SERVICE = DataService(GLOBAL_ALPACA_SERVICE)
     GLOBAL_ALGORITHM_SERVICE = AlgorithmService(GLOBAL_DATA_SERVICE, GLOBAL_ALPACA_SERVICE)
     GLOBAL_AUTOMATED_TRADING_SERVICE = AutomatedTradingService(
@@ -50,23 +58,92 @@ except Exception as e:
 
 GLOBAL_BACKUP_SERVICE = BackupService("trading.db")
 
-# Security
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
-ALGORITHM = "HS256"
+# Security (shared with AuthService so tokens it issues decode here)
+SECRET_KEY = AUTH_SECRET_KEY
+ALGORITHM = AUTH_ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Create limiter instance
-limiter = Limiter(key_func=get_remote_address)
 app = FastAPI(title="Trading Algorithm API",
              description="API for algorithmic trading using Alpaca",
              version="1.0.0")
 
-# Add rate limiter error handler
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+# Threads for blocking Alpaca SDK calls (run via asyncio.to_thread)
+SDK_THREAD_POOL_SIZE = 32
+
+@app.on_event("startup")
+async def size_sdk_thread_pool():
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=SDK_THREAD_POOL_SIZE, thread_name_prefix="alpaca-sdk")
+    )
+
+# Writes log records for the root logger's handlers off the event loop (set on startup)
+_log_listener: Optional[QueueListener] = None
+
+@app.on_event("startup")
+async def queue_log_output():
+    # Logging calls on the event loop only enqueue; a listener thread does the I/O
+    global _log_listener
+    root = logging.getLogger()
+    handlers = [handler for handler in root.handlers if not isinstance(handler, QueueHandler)]
+    if _log_listener is not None or not handlers:
+        return
+    log_queue = queue.SimpleQueue()
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    _log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+
+@app.on_event("shutdown")
+async def flush_log_output():
+    global _log_listener
+    if _log_listener is None:
+        return
+    _log_listener.stop()  # Writes out whatever is still queued
+    root = logging.getLogger()
+    for handler in [handler for handler in root.handlers if isinstance(handler, QueueHandler)]:
+        root.removeHandler(handler)
+    for handler in _log_listener.handlers:
+        root.addHandler(handler)
+    _log_listener = None
+
+@app.on_event("startup")
+async def check_alpaca_connection():
+    # Probe Alpaca once here instead of on every AlpacaService construction
+    if GLOBAL_ALPACA_SERVICE is not None and not await GLOBAL_ALPACA_SERVICE.health_check():
+        print("!!! WARNING: Alpaca health check failed; Alpaca-backed endpoints may error ---")
+
+@app.on_event("shutdown")
+async def close_alpaca_http_client():
+    if GLOBAL_ALPACA_SERVICE is not None:
+        await GLOBAL_ALPACA_SERVICE.aclose()
+
+# Per-client rate limits: (method, path prefix, limiter)
+RATE_LIMITS = (
+    ("GET", "/api/historical-bars/", TokenBucketLimiter(5, 60)),
+    ("POST", "/api/place-order", TokenBucketLimiter(3, 60)),
+    ("GET", "/api/position/", TokenBucketLimiter(10, 60)),
+)
+
+# Rate limiting runs before routing, so rejected requests skip dependency resolution.
+# Registered before CORSMiddleware so CORS wraps it and 429s still carry CORS headers.
+@app.middleware("http")
+async def rate_limit_requests(request: Request, call_next):
+    path = request.url.path
+    for method, prefix, limiter in RATE_LIMITS:
+        if request.method == method and path.startswith(prefix):
+            client_key = request.client.host if request.client else "unknown"
+            allowed, retry_after = limiter.acquire(client_key)
+            if not allowed:
+                return JSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={"error": f"Rate limit exceeded: {limiter.describe()}"},
+                    headers={"Retry-After": str(retry_after)}
+                )
+            break
+    return await call_next(request)
 
 # Add CORS middleware
 app.add_middleware(
@@ -161,20 +238,13 @@ class AlgorithmStatusUpdate(BaseModel):
 
 # Authentication functions
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return AuthService.verify_password(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return AuthService.get_password_hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return AuthService.create_access_token(data, expires_delta)
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
@@ -183,24 +253,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
+        token_data = TokenData(email=decode_access_token(token))
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == token_data.email).first()
+    user = get_user_by_email(db, token_data.email)
     if user is None:
         raise credentials_exception
     return user
 
-# Load standard Alpaca config from environment
-# Recommended names: APCA_API_KEY_ID, APCA_API_SECRET_KEY
-APCA_API_KEY_ID = os.getenv("APCA_API_KEY_ID") 
-APCA_API_SECRET_KEY = os.getenv("APCA_API_SECRET_KEY")
-PAPER_TRADING = os.getenv("PAPER_TRADING", "true").lower() == "true"
-
 # Remove or comment out the Broker API specific key loading
 # CENTRAL_ALPACA_API_KEY = os.getenv("ALPACA_API_KEY")
 # CENTRAL_ALPACA_SECRET_KEY = os.getenv("ALPACA_SECRET_KEY")
@@ -302,9 +362,8 @@ async def place_order(
 ):
     user_id = None
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        db_user = db.query(User).filter(User.email == email).first()
+        email = decode_access_token(token)
+        db_user = get_user_by_email(db, email)
         if db_user:
             user_id = db_user.id
             print(f"--- Placing order on behalf of user ID: {user_id} ({email}) ---")
@@ -350,13 +409,13 @@ async def place_order(
 async def get_trade_status(
     order_id: str,
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    alpaca_service: AlpacaService = Depends(get_alpaca_service)
 ):
     user_id = None 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        db_user = db.query(User).filter(User.email == email).first()
+        email = decode_access_token(token)
+        db_user = get_user_by_email(db, email)
         if db_user:
             user_id = db_user.id
     except JWTError:
@@ -369,12 +428,6 @@ async def get_trade_status(
     if not APCA_API_KEY_ID or not APCA_API_SECRET_KEY:
         raise HTTPException(status_code=500, detail="Alpaca paper trading credentials not configured on server.")
     
-    alpaca_service = AlpacaService(
-        APCA_API_KEY_ID,
-        APCA_API_SECRET_KEY,
-        paper=PAPER_TRADING
-    )
-    
     try:
         order_status = await alpaca_service.get_order_status(order_id)
         trade.status = order_status.get("status", trade.status)
@@ -387,17 +440,12 @@ async def get_trade_status(
 
 @app.get("/account-info")
 async def get_account_info(
-    token: str = Depends(oauth2_scheme)
+    token: str = Depends(oauth2_scheme),
+    alpaca_service: AlpacaService = Depends(get_alpaca_service)
 ):
     if not APCA_API_KEY_ID or not APCA_API_SECRET_KEY:
         raise HTTPException(status_code=500, detail="Alpaca paper trading credentials not configured on server.")
     
-    alpaca_service = AlpacaService(
-        APCA_API_KEY_ID,
-        APCA_API_SECRET_KEY,
-        paper=PAPER_TRADING
-    )
-    
     try:
         print("--- Attempting to fetch central Alpaca account info ---")
         account_info = await alpaca_service.get_account_info()
@@ -420,7 +468,7 @@ async def root():
     return {"message": "Hello World"}
 
 @app.get("/users/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(AuthService(get_db()).get_current_user)):
+async def read_users_me(current_user: User = Depends(AuthService.get_current_user)):
     return UserResponse(email=current_user.email, is_active=current_user.is_active)
 
 @app.get("/trades", response_model=List[TradeRead])
@@ -459,16 +507,12 @@ async def delete_trade(
 
 @app.get("/orders/open")
 async def read_open_orders(
-    token: str = Depends(oauth2_scheme)
+    token: str = Depends(oauth2_scheme),
+    alpaca_service: AlpacaService = Depends(get_alpaca_service)
 ):
     if not APCA_API_KEY_ID or not APCA_API_SECRET_KEY:
         raise HTTPException(status_code=500, detail="Alpaca credentials not configured on server.")
     
-    alpaca_service = AlpacaService(
-        APCA_API_KEY_ID,
-        APCA_API_SECRET_KEY,
-        paper=PAPER_TRADING
-    )
     try:
         print("--- Fetching open orders via service ---")
         open_orders = await alpaca_service.get_open_orders()
@@ -484,16 +528,12 @@ async def read_open_orders(
 @app.delete("/orders/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_order_endpoint(
     order_id: str,
-    token: str = Depends(oauth2_scheme)
+    token: str = Depends(oauth2_scheme),
+    alpaca_service: AlpacaService = Depends(get_alpaca_service)
 ):
     if not APCA_API_KEY_ID or not APCA_API_SECRET_KEY:
         raise HTTPException(status_code=500, detail="Alpaca credentials not configured on server.")
     
-    alpaca_service = AlpacaService(
-        APCA_API_KEY_ID,
-        APCA_API_SECRET_KEY,
-        paper=PAPER_TRADING
-    )
     try:
         print(f"--- Cancelling order {order_id} via service ---")
         await alpaca_service.cancel_order(order_id)
@@ -558,6 +598,7 @@ async def restore_backup(
     """Restore database from a backup."""
     try:
         GLOBAL_BACKUP_SERVICE.restore_backup(backup_path)
+        AlgorithmService.bump_version()  # The restored file may hold different algorithms
         return {"message": f"Database restored from backup: {backup_path}"}
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Backup file not found")
@@ -798,15 +839,31 @@ class SignalRead(BaseModel):
         from_attributes = True
         use_enum_values = True
 
+# Algorithm lists served by /api/algorithms, per user: (AlgorithmService.version, monotonic expiry, list).
+# Any algorithm write changes the version; the expiry covers edits made outside this process.
+USER_ALGORITHMS_CACHE_TTL = 30
+MAX_USER_ALGORITHMS_CACHE_ENTRIES = 1024
+_user_algorithms_cache: Dict[str, tuple] = {}
+
 @app.get("/api/algorithms", response_model=List[AlgorithmRead])
 async def get_user_algorithms(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Fetch all algorithms belonging to the current user."""
+    version = AlgorithmService.version  # Taken before the read, so a write during it isn't cached as current
+    now = time.monotonic()
+    cached = _user_algorithms_cache.get(current_user.id)
+    if cached is not None and cached[0] == version and now < cached[1]:
+        return cached[2]
     print(f"--- Fetching algorithms for user: {current_user.email} ({current_user.id}) ---")
     algos = db.query(Algorithm).filter(Algorithm.user_id == current_user.id).all()
-    return algos
+    result = [AlgorithmRead.model_validate(algo) for algo in algos]
+    _user_algorithms_cache.pop(current_user.id, None)
+    _user_algorithms_cache[current_user.id] = (version, now + USER_ALGORITHMS_CACHE_TTL, result)
+    if len(_user_algorithms_cache) > MAX_USER_ALGORITHMS_CACHE_ENTRIES:
+        del _user_algorithms_cache[next(iter(_user_algorithms_cache))]
+    return result
 
 # Add PATCH endpoint to update status
 @app.patch("/api/algorithms/{algorithm_id}/status", response_model=AlgorithmRead)
@@ -830,8 +887,7 @@ async def update_algorithm_status(
             detail="Algorithm not found or not authorized"
         )
     
-    db_algo.is_active = status_update.is_active
-    db_algo.updated_at = datetime.utcnow() # Manually update timestamp
+    db_algo.is_active = status_update.is_active # updated_at is set by the database on UPDATE
     
     try:
         db.commit()
@@ -881,7 +937,7 @@ async def run_specific_algorithm(
         )
         
     # Run the algorithm instance using the service
-    generated_signal = await algorithm_service.run_algorithm_instance(db_algo, db)
+    generated_signal = await algorithm_service.run_algorithm_instance(db_algo, SessionLocal)
     
     if generated_signal:
         # Signal generated: Return 201 Created with the signal data
@@ -1118,9 +1174,7 @@ class PositionResponse(BaseModel):
 
 # Update endpoints to use the models
 @app.get("/api/historical-bars/{symbol}", response_model=List[BarResponse])
-@limiter.limit("5/minute")
 async def get_historical_bars(
-    request: Request,
     symbol: str,
     timeframe: str = "1D",
     lookback_days: Optional[int] = None,
@@ -1157,9 +1211,7 @@ async def get_historical_bars(
         )
 
 @app.post("/api/place-order", response_model=OrderResponse)
-@limiter.limit("3/minute")
 async def place_order(
-    request: Request,
     order_data: OrderRequest,
     alpaca_service: AlpacaService = Depends(get_alpaca_service)
 ):
@@ -1178,9 +1230,7 @@ async def place_order(
         )
 
 @app.get("/api/position/{symbol}", response_model=PositionResponse)
-@limiter.limit("10/minute")
 async def get_position(
-    request: Request,
     symbol: str,
     alpaca_service: AlpacaService = Depends(get_alpaca_service)
 ):
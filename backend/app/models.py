@@ -1,32 +0,0 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime
-from sqlalchemy.orm import relationship
-from sqlalchemy.ext.declarative import declarative_base
-from datetime import datetime
-
-Base = declarative_base()
-
-class User(Base):
-    __tablename__ = "users"
-
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
-    hashed_password = Column(String, nullable=False)
-    is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    trades = relationship("Trade", back_populates="user")
-
-class Trade(Base):
-    __tablename__ = "trades"
-
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    symbol = Column(String)
-    quantity = Column(Float)
-    price = Column(Float)
-    side = Column(String)  # 'buy' or 'sell'
-    status = Column(String)  # 'pending', 'filled', 'cancelled'
-    order_id = Column(String, unique=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    user = relationship("User", back_populates="trades") 
\ No newline at end of file
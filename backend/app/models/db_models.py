@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, String, Float, DateTime, Enum as SQLEnum, ForeignKey, JSON, Boolean
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import enum
@@ -60,7 +61,7 @@ class Algorithm(Base):
     parameters = Column(JSON)
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     user = relationship("User", back_populates="algorithms")
     signals = relationship("Signal", back_populates="algorithm", cascade="all, delete-orphan")
@@ -69,7 +70,7 @@ class Signal(Base):
     __tablename__ = "signals"
 
     id = Column(Integer, primary_key=True, index=True)
-    algorithm_id = Column(Integer, ForeignKey("algorithms.id"))
+    algorithm_id = Column(Integer, ForeignKey("algorithms.id"), index=True)
     type = Column(SQLEnum(SignalType))
     symbol = Column(String, index=True)
     confidence = Column(Float)
@@ -88,9 +89,9 @@ class Position(Base):
     quantity = Column(Float)
     entry_price = Column(Float)
     current_price = Column(Float)
-    status = Column(SQLEnum(PositionStatus))
-    entry_time = Column(DateTime) # Keep entry_time (timestamp was in database.py)
-    last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    status = Column(SQLEnum(PositionStatus), index=True)
+    entry_time = Column(DateTime, server_default=func.now()) # Keep entry_time (timestamp was in database.py)
+    last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     additional_data = Column(JSON, nullable=True) # Keep renamed metadata
 
     user = relationship("User", back_populates="positions") # Add relationship back to User
@@ -101,8 +102,8 @@ class Trade(Base):
 
     id = Column(Integer, primary_key=True, index=True) # Keep Integer ID for Trade
     user_id = Column(String, ForeignKey("users.id")) # Add user_id ForeignKey from database.py definition
-    signal_id = Column(Integer, ForeignKey("signals.id"), nullable=True) # Foreign key to Signal.id (Integer)
-    position_id = Column(Integer, ForeignKey("positions.id"), nullable=True) # Foreign key to Position.id (Integer)
+    signal_id = Column(Integer, ForeignKey("signals.id"), nullable=True, index=True) # Foreign key to Signal.id (Integer)
+    position_id = Column(Integer, ForeignKey("positions.id"), nullable=True, index=True) # Foreign key to Position.id (Integer)
     symbol = Column(String, index=True)
     quantity = Column(Float)
     price = Column(Float)
@@ -16,7 +16,7 @@ class TradeStatus(str, Enum):
 class Trade(BaseModel):
     symbol: str
     quantity: float
-    price: float
+    price: Optional[float] = None  # Unknown until the order fills
     side: TradeType
     status: TradeStatus
     order_id: str
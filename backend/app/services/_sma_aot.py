@@ -0,0 +1,39 @@
+"""Trading-loop crossover kernel and its ahead-of-time build.
+
+    python -m app.services._sma_aot
+
+compiles crossover_signal into the _sma_kernel extension next to this file.
+automated_trading imports that extension when it exists, so the first trading
+iteration doesn't wait on the JIT, and falls back to njit otherwise.
+"""
+import os
+
+def crossover_signal(prices, short_window, long_window):
+    """Crossover signal from the latest short/long moving averages: 1 buy, -1 sell,
+    0 hold or not enough data. Only the last max(short, long) prices are read."""
+    n = prices.shape[0]
+    if short_window < 1 or long_window < 1 or n < short_window or n < long_window:
+        return 0
+    short_sum = 0.0
+    long_sum = 0.0
+    for k in range(max(short_window, long_window)):
+        price = prices[n - 1 - k]
+        if k < short_window:
+            short_sum += price
+        if k < long_window:
+            long_sum += price
+    short_last = short_sum / short_window
+    long_last = long_sum / long_window
+    if short_last > long_last:
+        return 1
+    if short_last < long_last:
+        return -1
+    return 0
+
+if __name__ == '__main__':
+    from numba.pycc import CC
+
+    cc = CC('_sma_kernel')
+    cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+    cc.export('compute_signal', 'i8(f8[::1], i8, i8)')(crossover_signal)
+    cc.compile()
@@ -1,214 +1,490 @@
-from typing import Dict, List, Optional
-import pandas as pd
+from typing import Callable, Dict, List, Optional, Tuple
 import numpy as np
 from datetime import datetime, timedelta
 import logging
+import asyncio
+from math import isfinite
 from app.services.data_service import DataService
 from app.services.alpaca_service import AlpacaService
 from app.models.algorithm import Algorithm, AlgorithmType
+from app.models.db_models import Algorithm as DBAlgorithm, AlgorithmType as DBAlgorithmType
 from app.models.signal import Signal, SignalType
 from app.models.position import Position, PositionStatus
 from app.models.trade import Trade, TradeType, TradeStatus
-from numba import njit
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # Without numba the kernels below run as plain NumPy/Python
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 logger = logging.getLogger(__name__)
 
-@njit
+# Prices are passed as contiguous float32 to halve memory traffic; float64 is kept
+# as a second signature for callers that already hold float64 arrays. Accumulators
+# inside the kernels stay float64. The kernels release the GIL, so signals for
+# several algorithms can be computed on worker threads in parallel.
+@njit(['Tuple((f4[::1], f4[::1]))(f4[::1], i8, i8)', 'Tuple((f8[::1], f8[::1]))(f8[::1], i8, i8)'], cache=True, fastmath=True, nogil=True)
 def calculate_moving_averages(prices: np.ndarray, short_window: int, long_window: int):
     short_ma = np.zeros_like(prices)
     long_ma = np.zeros_like(prices)
+    short_sum = 0.0
+    long_sum = 0.0
     
+    # Running window sums: add the new price, drop the one leaving the window
     for i in range(len(prices)):
+        short_sum += prices[i]
+        long_sum += prices[i]
+        if i >= short_window:
+            short_sum -= prices[i - short_window]
+        if i >= long_window:
+            long_sum -= prices[i - long_window]
         if i >= short_window - 1:
-            short_ma[i] = np.mean(prices[i - short_window + 1:i + 1])
+            short_ma[i] = short_sum / short_window
         if i >= long_window - 1:
-            long_ma[i] = np.mean(prices[i - long_window + 1:i + 1])
+            long_ma[i] = long_sum / long_window
     
     return short_ma, long_ma
 
-@njit
-def generate_signals(short_ma: np.ndarray, long_ma: np.ndarray):
-    signals = np.zeros_like(short_ma)
-    
-    for i in range(1, len(signals)):
-        # Generate signals based on current MA positions
-        if short_ma[i] > long_ma[i]:
-            signals[i] = 1  # Buy signal when short MA is above long MA
-        elif short_ma[i] < long_ma[i]:
-            signals[i] = -1  # Sell signal when short MA is below long MA
-        # HOLD (0) when MAs are equal (rare case)
-    
+if not NUMBA_AVAILABLE:
+    def calculate_moving_averages(prices: np.ndarray, short_window: int, long_window: int):
+        # The running-sum loop is slow as plain Python, so convolve instead
+        short_ma = np.zeros_like(prices)
+        long_ma = np.zeros_like(prices)
+        if len(prices) >= short_window:
+            short_ma[short_window - 1:] = np.convolve(prices, np.full(short_window, 1.0 / short_window, dtype=prices.dtype), mode='valid')
+        if len(prices) >= long_window:
+            long_ma[long_window - 1:] = np.convolve(prices, np.full(long_window, 1.0 / long_window, dtype=prices.dtype), mode='valid')
+        return short_ma, long_ma
+
+def generate_signals(short_ma: np.ndarray, long_ma: np.ndarray) -> np.ndarray:
+    # 1 = short MA above long (buy), -1 = below (sell), 0 = equal. A single
+    # vectorized ufunc pass, so there is nothing to gain from jitting it.
+    signals = np.sign(short_ma - long_ma).astype(np.int8, copy=False)
+    signals[:1] = 0  # No prior bar to compare against
     return signals
 
+@njit(['UniTuple(f8, 2)(f4[::1], i8)', 'UniTuple(f8, 2)(f8[::1], i8)'], cache=True, nogil=True)
+def calculate_rsi_averages(prices: np.ndarray, period: int):
+    # Wilder's smoothed average gain/loss at the last bar; needs at least period + 1 prices
+    delta = np.diff(prices)
+    gains = np.maximum(delta, 0.0)  # Branchless split of up and down moves
+    losses = np.maximum(-delta, 0.0)
+    avg_gain = gains[:period].mean()
+    avg_loss = losses[:period].mean()
+
+    for i in range(period, len(delta)):
+        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+
+    return avg_gain, avg_loss
+
+def rsi_from_averages(avg_gain: float, avg_loss: float) -> float:
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else np.nan  # Flat series has no defined RSI
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+@njit(['UniTuple(f8, 6)(f4[::1], i8, i8, i8)', 'UniTuple(f8, 6)(f8[::1], i8, i8, i8)'], cache=True, fastmath=True, nogil=True)
+def calculate_macd(prices: np.ndarray, short_window: int, long_window: int, signal_window: int):
+    # Short, long and signal EMAs (adjust=False) fused into one pass. Returns
+    # (ema_short, ema_long, prev_macd, macd, prev_signal, signal) at the last bar.
+    alpha_short = 2.0 / (short_window + 1)
+    alpha_long = 2.0 / (long_window + 1)
+    alpha_signal = 2.0 / (signal_window + 1)
+    decay_short = 1.0 - alpha_short
+    decay_long = 1.0 - alpha_long
+    decay_signal = 1.0 - alpha_signal
+
+    ema_short = prices[0]
+    ema_long = prices[0]
+    macd = 0.0
+    signal = 0.0
+    prev_macd = 0.0
+    prev_signal = 0.0
+
+    for i in range(1, len(prices)):
+        prev_macd = macd
+        prev_signal = signal
+        price = prices[i]
+        ema_short = alpha_short * price + decay_short * ema_short
+        ema_long = alpha_long * price + decay_long * ema_long
+        macd = ema_short - ema_long
+        signal = alpha_signal * macd + decay_signal * signal
+
+    return ema_short, ema_long, prev_macd, macd, prev_signal, signal
+
+@njit(['Tuple((i1[::1], f8[::1], f8[::1]))(f4[:, ::1], i8, i8)', 'Tuple((i1[::1], f8[::1], f8[::1]))(f8[:, ::1], i8, i8)'], parallel=True, cache=True, nogil=True)
+def batch_ma_signals(prices2d: np.ndarray, short_window: int, long_window: int):
+    # MA crossover on the last bar for every row (symbol) of prices2d.
+    # Returns int8 flags (1 = BUY, -1 = SELL, 0 = none) and the current MAs.
+    n_symbols, n = prices2d.shape
+    flags = np.zeros(n_symbols, dtype=np.int8)
+    short_ma = np.empty(n_symbols)
+    long_ma = np.empty(n_symbols)
+
+    for s in prange(n_symbols):
+        row = prices2d[s]
+        short_now = row[n - short_window:].sum() / short_window
+        short_prev = row[n - short_window - 1:n - 1].sum() / short_window
+        long_now = row[n - long_window:].sum() / long_window
+        long_prev = row[n - long_window - 1:n - 1].sum() / long_window
+        if short_now > long_now and short_prev <= long_prev:
+            flags[s] = 1
+        elif short_now < long_now and short_prev >= long_prev:
+            flags[s] = -1
+        short_ma[s] = short_now
+        long_ma[s] = long_now
+
+    return flags, short_ma, long_ma
+
+# Bars each algorithm type needs for its latest signal, from its parameters
+# (defaults match the _generate_*_signal methods)
+REQUIRED_BARS: Dict[AlgorithmType, Callable[[Dict], int]] = {
+    AlgorithmType.MOVING_AVERAGE_CROSSOVER: lambda params: params.get('long_window', 50) + 1,
+    AlgorithmType.RSI: lambda params: params.get('period', 14) + 1,
+    AlgorithmType.MACD: lambda params: params.get('long_window', 26) + params.get('signal_window', 9),
+}
+REQUIRED_BARS.update({DBAlgorithmType(algo_type.value): fn for algo_type, fn in list(REQUIRED_BARS.items())})
+# Extra calendar days on top of 7/5 per trading day, to cover market holidays
+CALENDAR_DAY_MARGIN = 10
+
+# Bars requested per stored algorithm instance
+INSTANCE_BAR_LIMIT = 1000
+
+def _save_signal(session_factory: Callable[[], Session], db_signal) -> None:
+    """Blocking insert of one signal, run through asyncio.to_thread. Leaving the
+    session block rolls back a failed transaction."""
+    with session_factory() as db:
+        db.add(db_signal)
+        db.commit()
+        db.refresh(db_signal)
+
+def instance_data_window(params: Dict) -> Tuple[str, int]:
+    """(timeframe, lookback_days) a stored algorithm instance fetches closes for."""
+    return params.get('timeframe', '1D'), params.get('lookback_days', 90)  # Increased default for safety
+
 class AlgorithmService:
+    # Bumped on every write to the algorithms table, so readers can cache the active set
+    version = 0
+
+    @classmethod
+    def bump_version(cls):
+        cls.version += 1
+
     def __init__(self, data_service: DataService, alpaca_service: AlpacaService):
         self.data_service = data_service
         self.alpaca_service = alpaca_service
+        # Indicator state per (algorithm id, symbol) so a single new bar can be applied incrementally
+        self._state: Dict[Tuple[Optional[int], str], Dict] = {}
+        # Signal generator per algorithm type; DB rows carry the SQLAlchemy enum, so map both
+        self._dispatch = {
+            AlgorithmType.MOVING_AVERAGE_CROSSOVER: self._generate_moving_average_signal,
+            AlgorithmType.RSI: self._generate_rsi_signal,
+            AlgorithmType.MACD: self._generate_macd_signal,
+        }
+        self._dispatch.update({DBAlgorithmType(algo_type.value): fn for algo_type, fn in list(self._dispatch.items())})
+
+    def _load_state(self, algorithm: Algorithm, timestamps, params: tuple) -> Optional[Dict]:
+        """Return cached state if it was computed at the bar just before the latest one."""
+        if timestamps is None or len(timestamps) < 2:
+            return None
+        state = self._state.get((getattr(algorithm, 'id', None), algorithm.symbol))
+        if state is None or state['params'] != params or state['last_timestamp'] != timestamps[-2]:
+            return None
+        return state
+
+    def _store_state(self, algorithm: Algorithm, timestamps, params: tuple, **values):
+        if timestamps is None or len(timestamps) == 0:
+            return
+        self._state[(getattr(algorithm, 'id', None), algorithm.symbol)] = {
+            'params': params, 'last_timestamp': timestamps[-1], **values
+        }
 
     async def generate_signal(self, algorithm: Algorithm, symbol: str) -> Optional[Signal]:
         try:
-            # Get historical data
+            generate = self._dispatch.get(algorithm.type)
+            if generate is None:
+                logger.error("Unsupported algorithm type: %s", algorithm.type)
+                return None
+
+            # Get only as much daily history as the indicator needs
+            required = REQUIRED_BARS[algorithm.type](algorithm.parameters)
             end_date = datetime.utcnow()
-            start_date = end_date - timedelta(days=algorithm.lookback_period)
+            start_date = end_date - timedelta(days=required * 7 // 5 + CALENDAR_DAY_MARGIN)
             data = await self.data_service.get_historical_data(symbol, start_date, end_date)
             
             if data.empty:
-                logger.warning(f"No data available for {symbol}")
+                logger.warning("No data available for %s", symbol)
                 return None
 
             # Convert data to numpy array for calculations
-            close_prices = data['close'].values
+            close_prices = np.ascontiguousarray(data['close'].to_numpy(dtype=np.float32))
             if len(close_prices) < 2:
-                logger.warning(f"Not enough data points for {symbol}")
+                logger.warning("Not enough data points for %s", symbol)
                 return None
 
             # Generate signal based on algorithm type
-            if algorithm.type == AlgorithmType.MOVING_AVERAGE_CROSSOVER:
-                signal = self._generate_moving_average_signal(close_prices, algorithm)
-            elif algorithm.type == AlgorithmType.RSI:
-                signal = self._generate_rsi_signal(close_prices, algorithm)
-            elif algorithm.type == AlgorithmType.MACD:
-                signal = self._generate_macd_signal(close_prices, algorithm)
-            else:
-                logger.error(f"Unsupported algorithm type: {algorithm.type}")
-                return None
+            signal = generate(close_prices, algorithm, data.index)
 
             if signal:
-                logger.info(f"Generated {signal.type} signal for {symbol}")
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Generated %s signal for %s", signal.type, symbol)
             return signal
 
         except Exception as e:
-            logger.error(f"Error in generate_signal: {str(e)}")
+            logger.error("Error in generate_signal: %s", e)
             return None
 
-    def _generate_moving_average_signal(self, close_prices: np.ndarray, algorithm: Algorithm) -> Optional[Signal]:
+    async def generate_signals_batch(self, algos_by_type: Dict[AlgorithmType, List[Algorithm]]) -> List[Signal]:
+        """Generate signals for many algorithms at once.
+
+        Moving average crossovers sharing the same windows are evaluated in a
+        single parallel kernel call over all their symbols; other types fall
+        back to generate_signal per algorithm.
+        """
+        signals: List[Signal] = []
+
+        ma_groups: Dict[Tuple[int, int], List[Algorithm]] = {}
+        for algorithm in algos_by_type.get(AlgorithmType.MOVING_AVERAGE_CROSSOVER, []):
+            windows = (algorithm.parameters.get('short_window', 20), algorithm.parameters.get('long_window', 50))
+            ma_groups.setdefault(windows, []).append(algorithm)
+
+        for (short_window, long_window), algorithms in ma_groups.items():
+            # One multi-symbol request for the whole group
+            try:
+                closes_by_symbol = await self.alpaca_service.get_close_prices(
+                    list({algorithm.symbol for algorithm in algorithms}),
+                    lookback_days=(long_window + 1) * 7 // 5 + CALENDAR_DAY_MARGIN,
+                    dtype=np.float32
+                )
+            except Exception as e:
+                logger.error("Error fetching bars for MA batch %s/%s: %s", short_window, long_window, e)
+                continue
+
+            usable = [
+                (algorithm, closes_by_symbol[algorithm.symbol])
+                for algorithm in algorithms
+                if len(closes_by_symbol.get(algorithm.symbol, ())) >= long_window + 1
+            ]
+            if len(usable) < len(algorithms):
+                logger.warning("Skipping %d MA algorithms with missing or short history", len(algorithms) - len(usable))
+            if not usable:
+                continue
+
+            # Align on the most recent common number of bars
+            n_bars = min(len(closes) for _, closes in usable)
+            prices2d = np.ascontiguousarray(np.stack([closes[-n_bars:] for _, closes in usable]))
+            flags, short_ma, long_ma = batch_ma_signals(prices2d, short_window, long_window)
+
+            now = datetime.utcnow()
+            for i, (algorithm, _) in enumerate(usable):
+                if flags[i] == 0:
+                    continue
+                signals.append(Signal.model_construct(
+                    type=SignalType.BUY if flags[i] > 0 else SignalType.SELL,
+                    symbol=algorithm.symbol,
+                    timestamp=now,
+                    confidence=1.0,
+                    metadata={"short_ma": float(short_ma[i]), "long_ma": float(long_ma[i])}
+                ))
+
+        for algo_type, algorithms in algos_by_type.items():
+            if algo_type == AlgorithmType.MOVING_AVERAGE_CROSSOVER:
+                continue
+            results = await asyncio.gather(*(
+                self.generate_signal(algorithm, algorithm.symbol) for algorithm in algorithms
+            ))
+            signals.extend(signal for signal in results if signal)
+
+        return signals
+
+    def _generate_moving_average_signal(self, close_prices: np.ndarray, algorithm: Algorithm, timestamps=None) -> Optional[Signal]:
         try:
             # Calculate moving averages
             short_window = algorithm.parameters.get('short_window', 20)
             long_window = algorithm.parameters.get('long_window', 50)
+
+            # Crossover detection only needs the last two values of each MA
+            if len(close_prices) < long_window + 1:
+                logger.warning("Not enough data points for %s/%s MA crossover on %s", short_window, long_window, algorithm.symbol)
+                return None
+
+            params = ('ma', short_window, long_window)
+            state = self._load_state(algorithm, timestamps, params)
+            if state is not None:
+                # One new bar: slide the cached window sums
+                prev_short_sum, prev_long_sum = state['short_sum'], state['long_sum']
+                short_sum = prev_short_sum + close_prices[-1] - close_prices[-short_window - 1]
+                long_sum = prev_long_sum + close_prices[-1] - close_prices[-long_window - 1]
+            else:
+                short_sum = close_prices[-short_window:].sum()
+                prev_short_sum = close_prices[-short_window - 1:-1].sum()
+                long_sum = close_prices[-long_window:].sum()
+                prev_long_sum = close_prices[-long_window - 1:-1].sum()
+            self._store_state(algorithm, timestamps, params, short_sum=short_sum, long_sum=long_sum)
+
+            short_ma = short_sum / short_window
+            prev_short_ma = prev_short_sum / short_window
+            long_ma = long_sum / long_window
+            prev_long_ma = prev_long_sum / long_window
             
-            short_ma, long_ma = calculate_moving_averages(close_prices, short_window, long_window)
-            
-            # Generate signal
-            if short_ma[-1] > long_ma[-1] and short_ma[-2] <= long_ma[-2]:
-                return Signal(
+            # Generate signal; fields are already typed, so model_construct skips validation
+            now = datetime.utcnow()
+            if short_ma > long_ma and prev_short_ma <= prev_long_ma:
+                return Signal.model_construct(
                     type=SignalType.BUY, 
                     symbol=algorithm.symbol,
-                    timestamp=datetime.utcnow(),
+                    timestamp=now,
                     confidence=1.0, 
-                    metadata={"short_ma": short_ma[-1], "long_ma": long_ma[-1]}
+                    metadata={"short_ma": float(short_ma), "long_ma": float(long_ma)}
                 )
-            elif short_ma[-1] < long_ma[-1] and short_ma[-2] >= long_ma[-2]:
-                return Signal(
+            elif short_ma < long_ma and prev_short_ma >= prev_long_ma:
+                return Signal.model_construct(
                     type=SignalType.SELL, 
                     symbol=algorithm.symbol,
-                    timestamp=datetime.utcnow(),
+                    timestamp=now,
                     confidence=1.0, 
-                    metadata={"short_ma": short_ma[-1], "long_ma": long_ma[-1]}
+                    metadata={"short_ma": float(short_ma), "long_ma": float(long_ma)}
                 )
             return None
         except Exception as e:
-            logger.error(f"Error in _generate_moving_average_signal: {str(e)}")
+            logger.error("Error in _generate_moving_average_signal: %s", e)
             return None
 
-    def _generate_rsi_signal(self, close_prices: np.ndarray, algorithm: Algorithm) -> Optional[Signal]:
+    def _generate_rsi_signal(self, close_prices: np.ndarray, algorithm: Algorithm, timestamps=None) -> Optional[Signal]:
         try:
             # Calculate RSI
             period = algorithm.parameters.get('period', 14)
             overbought = algorithm.parameters.get('overbought', 70)
             oversold = algorithm.parameters.get('oversold', 30)
             
-            delta = pd.Series(close_prices).diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            current_rsi = rsi.iloc[-1] # Get the last RSI value
+            if len(close_prices) < period + 1:
+                logger.warning("Not enough data points for RSI(%s) on %s", period, algorithm.symbol)
+                return None
+
+            params = ('rsi', period)
+            state = self._load_state(algorithm, timestamps, params)
+            if state is not None:
+                # One new bar: a single Wilder smoothing step
+                delta = float(close_prices[-1] - close_prices[-2])
+                avg_gain = (state['avg_gain'] * (period - 1) + max(delta, 0.0)) / period
+                avg_loss = (state['avg_loss'] * (period - 1) + max(-delta, 0.0)) / period
+            else:
+                avg_gain, avg_loss = calculate_rsi_averages(np.ascontiguousarray(close_prices, dtype=np.float32), period)
+            self._store_state(algorithm, timestamps, params, avg_gain=avg_gain, avg_loss=avg_loss)
+
+            current_rsi = rsi_from_averages(avg_gain, avg_loss)
             
             # Check if rsi calculation resulted in NaN or Inf
-            if np.isnan(current_rsi) or np.isinf(current_rsi):
-                logger.warning(f"RSI calculation resulted in invalid value ({current_rsi}) for {algorithm.symbol}. Skipping signal.")
+            if not isfinite(current_rsi):
+                logger.warning("RSI calculation resulted in invalid value (%s) for %s. Skipping signal.", current_rsi, algorithm.symbol)
                 return None
 
             # Generate signal
+            now = datetime.utcnow()
             if current_rsi < oversold:
-                return Signal(
+                return Signal.model_construct(
                     type=SignalType.BUY, 
                     symbol=algorithm.symbol,
-                    timestamp=datetime.utcnow(),
+                    timestamp=now,
                     confidence=1.0, 
                     metadata={"rsi": current_rsi, "oversold_threshold": oversold}
                 )
             elif current_rsi > overbought:
-                return Signal(
+                return Signal.model_construct(
                     type=SignalType.SELL, 
                     symbol=algorithm.symbol,
-                    timestamp=datetime.utcnow(),
+                    timestamp=now,
                     confidence=1.0, 
                     metadata={"rsi": current_rsi, "overbought_threshold": overbought}
                 )
             return None
         except Exception as e:
-            logger.error(f"Error in _generate_rsi_signal: {str(e)}")
+            logger.error("Error in _generate_rsi_signal: %s", e)
             return None
 
-    def _generate_macd_signal(self, close_prices: np.ndarray, algorithm: Algorithm) -> Optional[Signal]:
+    def _generate_macd_signal(self, close_prices: np.ndarray, algorithm: Algorithm, timestamps=None) -> Optional[Signal]:
         try:
             # Calculate MACD
             short_window = algorithm.parameters.get('short_window', 12)
             long_window = algorithm.parameters.get('long_window', 26)
             signal_window = algorithm.parameters.get('signal_window', 9)
             
-            exp1 = pd.Series(close_prices).ewm(span=short_window, adjust=False).mean()
-            exp2 = pd.Series(close_prices).ewm(span=long_window, adjust=False).mean()
-            macd = exp1 - exp2
-            signal_line = macd.ewm(span=signal_window, adjust=False).mean()
-            
-            current_macd = macd.iloc[-1]
-            prev_macd = macd.iloc[-2]
-            current_signal_line = signal_line.iloc[-1]
-            prev_signal_line = signal_line.iloc[-2]
+            params = ('macd', short_window, long_window, signal_window)
+            state = self._load_state(algorithm, timestamps, params)
+            if state is not None:
+                # One new bar: a single step of each EMA recurrence
+                price = float(close_prices[-1])
+                alpha_short = 2.0 / (short_window + 1)
+                alpha_long = 2.0 / (long_window + 1)
+                alpha_signal = 2.0 / (signal_window + 1)
+                ema_short = alpha_short * price + (1.0 - alpha_short) * state['ema_short']
+                ema_long = alpha_long * price + (1.0 - alpha_long) * state['ema_long']
+                prev_macd, prev_signal_line = state['macd'], state['signal_line']
+                current_macd = ema_short - ema_long
+                current_signal_line = alpha_signal * current_macd + (1.0 - alpha_signal) * prev_signal_line
+            else:
+                ema_short, ema_long, prev_macd, current_macd, prev_signal_line, current_signal_line = calculate_macd(
+                    np.ascontiguousarray(close_prices, dtype=np.float32), short_window, long_window, signal_window
+                )
+            self._store_state(
+                algorithm, timestamps, params,
+                ema_short=ema_short, ema_long=ema_long, macd=current_macd, signal_line=current_signal_line
+            )
 
              # Check if calculations resulted in NaN or Inf
-            if any(np.isnan([current_macd, prev_macd, current_signal_line, prev_signal_line])) or \
-               any(np.isinf([current_macd, prev_macd, current_signal_line, prev_signal_line])):
-                logger.warning(f"MACD calculation resulted in invalid value for {algorithm.symbol}. Skipping signal.")
+            if not (isfinite(current_macd) and isfinite(prev_macd) and
+                    isfinite(current_signal_line) and isfinite(prev_signal_line)):
+                logger.warning("MACD calculation resulted in invalid value for %s. Skipping signal.", algorithm.symbol)
                 return None
 
             # Generate signal based on crossover
+            now = datetime.utcnow()
             if current_macd > current_signal_line and prev_macd <= prev_signal_line:
-                 return Signal(
+                 return Signal.model_construct(
                     type=SignalType.BUY, 
                     symbol=algorithm.symbol,
-                    timestamp=datetime.utcnow(),
+                    timestamp=now,
                     confidence=1.0, 
                     metadata={"macd": current_macd, "signal_line": current_signal_line}
                 )
             elif current_macd < current_signal_line and prev_macd >= prev_signal_line:
-                 return Signal(
+                 return Signal.model_construct(
                     type=SignalType.SELL, 
                     symbol=algorithm.symbol,
-                    timestamp=datetime.utcnow(),
+                    timestamp=now,
                     confidence=1.0, 
                     metadata={"macd": current_macd, "signal_line": current_signal_line}
                 )
             return None 
         except Exception as e:
-            logger.error(f"Error in _generate_macd_signal: {str(e)}")
+            logger.error("Error in _generate_macd_signal: %s", e)
             return None
 
-    async def run_algorithm_instance(self, algorithm: Algorithm, db: Session) -> Optional[Signal]:
+    async def run_algorithm_instance(
+        self,
+        algorithm: Algorithm,
+        session_factory: Callable[[], Session],
+        close_prices: Optional[np.ndarray] = None
+    ) -> Optional[Signal]:
         """
         Runs a specific algorithm instance, fetches data, calculates signals using the appropriate
         internal method, saves the latest signal to the database if generated, and returns the 
-        Pydantic Signal object.
+        Pydantic Signal object. A session is only opened from session_factory when there is a
+        signal to save. Callers that already fetched the instance's window (see
+        instance_data_window) can pass close_prices to skip the fetch.
         """
-        print(f"--- Running Algorithm ID: {algorithm.id}, Symbol: {algorithm.symbol}, Type: {algorithm.type} ---")
+        logger.debug("--- Running Algorithm ID: %s, Symbol: %s, Type: %s ---", algorithm.id, algorithm.symbol, algorithm.type)
         
-        # Import the DB version of the enum for comparison
-        from app.models.db_models import AlgorithmType as DBAlgorithmType 
-
         # Extract parameters and perform basic validation
         try:
             symbol = algorithm.symbol
@@ -217,9 +493,7 @@ class AlgorithmService:
             algo_type_from_db = algorithm.type 
 
             # Common params (can be adjusted or made type-specific)
-            timeframe = params.get('timeframe', '1D')
-            lookback_days = params.get('lookback_days', 90) # Increased default for safety
-            limit = 1000 # Max bars to fetch initially
+            timeframe, lookback_days = instance_data_window(params)
 
             # Validate required parameters based on type using the DB Enum
             if algo_type_from_db == DBAlgorithmType.MOVING_AVERAGE_CROSSOVER:
@@ -250,45 +524,43 @@ class AlgorithmService:
 
         except Exception as e:
             # Log the specific error encountered during parameter validation
-            logger.error(f"Algorithm {algorithm.id}: Error validating parameters: {e!r}") 
+            logger.error("Algorithm %s: Error validating parameters: %r", algorithm.id, e) 
             return None # Cannot proceed without valid parameters
             
         # Log the specific timeframe value before passing it
-        logger.info(f"Algorithm {algorithm.id}: Using timeframe parameter value: '{timeframe}'")
+        logger.info("Algorithm %s: Using timeframe parameter value: '%s'", algorithm.id, timeframe)
 
         # Fetch historical data
         try:
-            prices = await self.alpaca_service.get_historical_bars(
-                symbol=symbol,
-                timeframe=timeframe,
-                lookback_days=lookback_days,
-                limit=limit
-            )
+            if close_prices is None:
+                close_prices = await self.alpaca_service.get_close_prices(
+                    symbol=symbol,
+                    timeframe=timeframe,
+                    lookback_days=lookback_days,
+                    limit=INSTANCE_BAR_LIMIT,
+                    dtype=np.float32
+                )
             
-            if not prices or len(prices) < required_data_length:
-                logger.warning(f"Algorithm {algorithm.id}: Insufficient historical price data ({len(prices) if prices else 0}) for {symbol}. Need at least {required_data_length}. Skipping signal.")
+            if len(close_prices) < required_data_length:
+                logger.warning("Algorithm %s: Insufficient historical price data (%d) for %s. Need at least %d. Skipping signal.", algorithm.id, len(close_prices), symbol, required_data_length)
                 return None
                 
-            close_prices = np.array(prices)
-            print(f"--- Fetched {len(close_prices)} price points for {symbol} ---")
+            logger.debug("--- Fetched %d price points for %s ---", len(close_prices), symbol)
             
         except Exception as e:
-            logger.error(f"Algorithm {algorithm.id}: Error fetching historical data for {symbol}: {e!r}")
+            logger.error("Algorithm %s: Error fetching historical data for %s: %r", algorithm.id, symbol, e)
             return None
             
         # Generate signal using the appropriate internal method
         generated_pydantic_signal: Optional[Signal] = None
         try:
             # Pass the original algorithm object (which might be needed by the generation funcs)
-            if algo_type_from_db == DBAlgorithmType.MOVING_AVERAGE_CROSSOVER:
-                generated_pydantic_signal = self._generate_moving_average_signal(close_prices, algorithm)
-            elif algo_type_from_db == DBAlgorithmType.RSI:
-                generated_pydantic_signal = self._generate_rsi_signal(close_prices, algorithm)
-            elif algo_type_from_db == DBAlgorithmType.MACD:
-                generated_pydantic_signal = self._generate_macd_signal(close_prices, algorithm)
+            # Unsupported types were already rejected during parameter validation.
+            # Runs on a worker thread so the event loop keeps serving other algorithms
+            generated_pydantic_signal = await asyncio.to_thread(self._dispatch[algo_type_from_db], close_prices, algorithm)
                  
         except Exception as e:
-            logger.error(f"Algorithm {algorithm.id}: Error during signal generation function for {symbol}: {e!r}")
+            logger.error("Algorithm %s: Error during signal generation function for %s: %r", algorithm.id, symbol, e)
             return None # Signal generation failed
 
         # Save the signal to the database if generated
@@ -306,27 +578,58 @@ class AlgorithmService:
                     timestamp=generated_pydantic_signal.timestamp,
                     additional_data=generated_pydantic_signal.metadata
                 )
-                db.add(db_signal)
-                db.commit()
-                db.refresh(db_signal)
-                logger.info(f"--- Saved Signal ID: {db_signal.id} for Algorithm ID: {algorithm.id} ({str(generated_pydantic_signal.type.value)}) ---")
+                await asyncio.to_thread(_save_signal, session_factory, db_signal)
+                logger.info("--- Saved Signal ID: %s for Algorithm ID: %s (%s) ---", db_signal.id, algorithm.id, generated_pydantic_signal.type.value)
                 
                 # Return the Pydantic model for the API response
                 return generated_pydantic_signal 
                 
             except ImportError:
-                 logger.error(f"Failed to import database Signal model (DBSignal). Cannot save signal for Algorithm ID {algorithm.id}.")
-                 db.rollback() # Rollback potential add
+                 logger.error("Failed to import database Signal model (DBSignal). Cannot save signal for Algorithm ID %s.", algorithm.id)
                  return None # Indicate failure but signal was technically generated
             except Exception as e:
-                db.rollback()
-                logger.error(f"Algorithm {algorithm.id}: Error saving signal to database: {e!r}")
+                # Leaving the session block already rolled back the failed transaction
+                logger.error("Algorithm %s: Error saving signal to database: %r", algorithm.id, e)
                 return None # Failed to save
         else:
-            logger.info(f"--- No BUY/SELL signal generated by algorithm {algorithm.id} ({symbol}) ---")
+            logger.info("--- No BUY/SELL signal generated by algorithm %s (%s) ---", algorithm.id, symbol)
             return None
 
     # Placeholder for other algorithm-related methods if needed
     def list_algorithms_for_user(self, user_id: int, db: Session) -> List[Algorithm]:
          # Example: Method to list algorithms (implementation might exist elsewhere)
-         pass 
\ No newline at end of file
+         pass
+
+def _warm_up_kernels():
+    """Run every kernel once at import so the first request does not pay for
+    loading compiled code or starting the parallel threading layer."""
+    warm = np.zeros(64, dtype=np.float32)
+    calculate_moving_averages(warm, 5, 10)
+    calculate_rsi_averages(warm, 14)
+    calculate_macd(warm, 12, 26, 9)
+    batch_ma_signals(np.zeros((2, 64), dtype=np.float32), 5, 10)
+
+_warm_up_kernels()
+
+# ORM writes from any code path (endpoints, signup's default algorithm) bump the version.
+# Mapper events fire at flush, before the write is committed, so they only mark the
+# session; the bump happens once the transaction commits and readers can see the change.
+_ALGORITHMS_WRITTEN = 'algorithms_written'
+
+def _on_algorithm_write(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info[_ALGORITHMS_WRITTEN] = True
+
+def _on_commit(session):
+    if session.info.pop(_ALGORITHMS_WRITTEN, False):
+        AlgorithmService.bump_version()
+
+def _on_transaction_end(session, transaction):
+    if transaction.parent is None:  # Rolled back or closed without a commit
+        session.info.pop(_ALGORITHMS_WRITTEN, None)
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(DBAlgorithm, _event_name, _on_algorithm_write)
+event.listen(Session, 'after_commit', _on_commit)
+event.listen(Session, 'after_transaction_end', _on_transaction_end)
@@ -1,22 +1,29 @@
 from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.trading.client import TradingClient
-from alpaca.data.requests import StockBarsRequest, StockLatestQuoteRequest
+from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
 from fastapi import HTTPException
 import os
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from alpaca.trading.requests import MarketOrderRequest, GetPortfolioHistoryRequest
-from alpaca.trading.enums import OrderSide, TimeInForce
-from typing import Dict, List, Optional, Tuple
+from alpaca.trading.enums import OrderSide, OrderType, TimeInForce
+from typing import Any, Dict, Hashable, List, Optional, Tuple, Union
 import logging
 from app.models.position import Position, PositionStatus
 from app.models.trade import Trade, TradeType, TradeStatus
-from alpaca.trading.models import PortfolioHistory
-import httpx
+from app.services.cache import FileCache
+from app.services.rate_limiter import TokenBucketLimiter
+from alpaca.trading.models import PortfolioHistory, TradeAccount
 from alpaca.common.exceptions import APIError
-from functools import lru_cache
+import httpx
+import orjson
 import time
+import asyncio
+import numpy as np
+import pandas as pd
+from collections import Counter
+from dataclasses import dataclass
 
 # Load environment variables
 load_dotenv()
@@ -27,9 +34,165 @@ APCA_API_SECRET_KEY = os.getenv("APCA_API_SECRET_KEY")
 
 logger = logging.getLogger(__name__)
 
+# Timeframe strings accepted by get_historical_bars
+TIMEFRAME_MAP: Dict[str, TimeFrame] = {
+    '1D': TimeFrame.Day,
+    '1H': TimeFrame.Hour,
+    '15Min': TimeFrame(15, TimeFrameUnit.Minute),
+    '5Min': TimeFrame(5, TimeFrameUnit.Minute),
+    '1Min': TimeFrame(1, TimeFrameUnit.Minute),
+}
+SUPPORTED_TIMEFRAMES = ', '.join(TIMEFRAME_MAP)
+# Time between consecutive bars of each timeframe
+BAR_INTERVALS: Dict[str, timedelta] = {
+    '1D': timedelta(days=1),
+    '1H': timedelta(hours=1),
+    '15Min': timedelta(minutes=15),
+    '5Min': timedelta(minutes=5),
+    '1Min': timedelta(minutes=1),
+}
+
+# Order side and time-in-force strings accepted by place_order
+ORDER_SIDE_MAP: Dict[str, OrderSide] = {side.value: side for side in OrderSide}
+TIME_IN_FORCE_MAP: Dict[str, TimeInForce] = {
+    'day': TimeInForce.DAY,
+    'gtc': TimeInForce.GTC,
+}
+
+# Alpaca accepts at most this many symbols in one bars request
+MAX_SYMBOLS_PER_BARS_REQUEST = 200
+
+# Response cache TTLs in seconds
+BARS_CACHE_TTL = 60
+# Coarser bars change less often, so rolling lookbacks can be reused for longer
+BARS_CACHE_TTL_BY_TIMEFRAME = {
+    '1Min': 60,
+    '5Min': 5 * 60,
+    '15Min': 15 * 60,
+    '1H': 30 * 60,
+    '1D': 60 * 60,
+}
+FIXED_RANGE_DAILY_BARS_CACHE_TTL = 24 * 60 * 60  # Closed daily bars for a fixed date range don't change
+ACCOUNT_CACHE_TTL = 5
+PORTFOLIO_HISTORY_CACHE_TTL = 60
+TRADABLE_SYMBOLS_CACHE_TTL = 6 * 60 * 60  # The asset universe changes over days, not minutes
+MAX_CACHE_ENTRIES = 2048
+
+# Latest quotes are the same for every account, so all services share one price cache
+PRICE_CACHE_TTL = 60
+MAX_PRICE_CACHE_ENTRIES = 10_000
+_latest_prices: Dict[str, Tuple[float, float]] = {}  # symbol -> (price, monotonic expiry), oldest first
+
+# On-disk bars cache for explicit date ranges. Ranges that ended this many days
+# ago are kept until evicted; more recent ones expire after FILE_CACHE_TTL
+BARS_FILE_CACHE = FileCache(os.path.expanduser("~/.alpaca_cache/bars"))
+SETTLED_BARS_AGE_DAYS = 7
+FILE_CACHE_TTL = 24 * 60 * 60
+
+# Cap on SDK calls in flight at once, to stay inside Alpaca's rate limit
+MAX_CONCURRENT_SDK_CALLS = 10
+
+# Most bars the data API returns per page
+BARS_PAGE_LIMIT = 10_000
+
+# Market data REST API; the trading API base URL depends on paper vs live
+DATA_BASE_URL = "https://data.alpaca.markets"
+
+# Outbound pacing for Alpaca's 200 requests/minute limit, one bucket per API
+# ('trading', 'data'), shared by every AlpacaService
+ALPACA_RATE_LIMITER = TokenBucketLimiter(200, 60)
+
+# Retries for transient HTTP failures (network errors, 5xx): exponential backoff
+HTTP_RETRY_ATTEMPTS = 3
+HTTP_RETRY_BACKOFF = 0.2
+HTTP_RETRY_BACKOFF_MAX = 2.0
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+# alpaca-py already retries these itself (3 tries, fixed wait), so SDK calls only retry the rest
+SDK_RETRIED_STATUS_CODES = frozenset({429, 504})
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Exponential backoff, or the server's Retry-After (in seconds) when it sent one."""
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return min(HTTP_RETRY_BACKOFF * 2 ** (attempt - 1), HTTP_RETRY_BACKOFF_MAX)
+
+@dataclass(slots=True)
+class PortfolioHistoryArrays:
+    """Portfolio history as one NumPy array per field (epoch-second timestamps)."""
+    timestamp: np.ndarray
+    equity: np.ndarray
+    profit_loss: np.ndarray
+    profit_loss_pct: np.ndarray
+    base_value: float
+    timeframe: str
+
+_rolling_windows: Dict[int, Tuple[float, datetime, datetime]] = {}  # lookback_days -> (computed at, start, end)
+
+def _rolling_window(lookback_days: int) -> Tuple[datetime, datetime]:
+    """Start/end for a lookback ending 15 minutes ago (IEX delay), truncated to the
+    minute and reused for up to a minute so repeated calls skip the date math."""
+    now = time.monotonic()
+    cached = _rolling_windows.get(lookback_days)
+    if cached is not None and now - cached[0] < 60:
+        return cached[1], cached[2]
+    end_date = (datetime.now(timezone.utc) - timedelta(minutes=15)).replace(second=0, microsecond=0)
+    start_date = end_date - timedelta(days=lookback_days)
+    _rolling_windows[lookback_days] = (now, start_date, end_date)
+    return start_date, end_date
+
+def _rfc3339(value: datetime) -> str:
+    """Timestamp for data API query strings; naive datetimes are taken as UTC, as the SDK does."""
+    if value.tzinfo is None or value.tzinfo.utcoffset(value) is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+BAR_PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+def _bars_columns(bars: List[Dict]) -> Dict[str, Any]:
+    """Bar dicts as typed columns: timestamps plus one float64 array per price field."""
+    columns: Dict[str, Any] = {'timestamp': pd.DatetimeIndex([bar['timestamp'] for bar in bars])}
+    for field in BAR_PRICE_FIELDS:
+        columns[field] = np.fromiter((bar[field] for bar in bars), dtype=np.float64, count=len(bars))
+    return columns
+
+def _bars_to_frame(bars_by_symbol: Dict[str, List[Dict]]) -> pd.DataFrame:
+    frames = [
+        pd.DataFrame({'symbol': sym, **_bars_columns(bars)})
+        for sym, bars in bars_by_symbol.items()
+    ]
+    if not frames:
+        return pd.DataFrame(columns=['symbol', 'timestamp', *BAR_PRICE_FIELDS])
+    return pd.concat(frames, ignore_index=True)
+
+def _frame_to_bars(df: pd.DataFrame) -> Dict[str, List[Dict]]:
+    return {
+        sym: group.drop(columns='symbol').to_dict('records')
+        for sym, group in df.groupby('symbol', sort=False)
+    }
+
+# Blocking file cache round trips, run through asyncio.to_thread
+def _read_cached_bars(key: str) -> Optional[Dict[str, List[Dict]]]:
+    frame = BARS_FILE_CACHE.get(key)
+    return None if frame is None else _frame_to_bars(frame)
+
+def _write_cached_bars(key: str, bars_by_symbol: Dict[str, List[Dict]], ttl: Optional[float]):
+    BARS_FILE_CACHE.set(key, _bars_to_frame(bars_by_symbol), ttl)
+
+async def run_stream(stream) -> None:
+    """Run an alpaca-py websocket stream (TradingStream, StockDataStream) on the current loop."""
+    # The public stream.run() wraps this coroutine in asyncio.run(), which raises inside
+    # an already running loop such as the server's, so await the private coroutine it runs.
+    # _run_forever is not public API: alpaca-py is pinned in requirements.txt for that reason.
+    await stream._run_forever()
+
 class AlpacaService:
+    __slots__ = (
+        "trading_client", "_market_data_client", "api_key", "secret_key", "paper", "base_url",
+        "_cache", "_cache_ttl", "_cache_stats", "_account_lock", "_http", "_assets_lock"
+    )
+
     def __init__(self, api_key_id: str = None, secret_key: str = None, paper: bool = True):
-        print(f"--- Initializing Alpaca API for paper={paper} ---")
+        logger.debug("--- Initializing Alpaca API for paper=%s ---", paper)
         try:
             # Use provided keys or fall back to environment variables
             api_key = api_key_id or APCA_API_KEY_ID
@@ -38,65 +201,137 @@ class AlpacaService:
             if not api_key or not secret:
                 raise ValueError("API keys not found. Please provide them or set them in environment variables.")
             
-            print(f"--- Using API Key ID: {api_key[:5]}... ---")
+            logger.debug("--- Using API Key ID: %s... ---", api_key[:5])
             
             # Initialize trading client first (as it's more critical)
-            print("--- Initializing Trading Client ---")
+            logger.debug("--- Initializing Trading Client ---")
             self.trading_client = TradingClient(
                 api_key=api_key,
                 secret_key=secret,
                 paper=paper
             )
             
-            # Test trading client connection
-            try:
-                account = self.trading_client.get_account()
-                print(f"--- Trading account status: {account.status} ---")
-                print(f"--- Account equity: {account.equity} ---")
-            except Exception as e:
-                print(f"!!! Failed to get trading account: {e!r}")
-                raise
-            
-            # Initialize market data client
-            print("--- Initializing Market Data Client ---")
-            self.market_data_client = StockHistoricalDataClient(
-                api_key=api_key,
-                secret_key=secret
-            )
+            # The market data client is created on first use; account and order flows never need it
+            self._market_data_client: Optional[StockHistoricalDataClient] = None
             
-            # Test market data client
-            try:
-                # Try to get a single bar to test the connection
-                test_request = StockBarsRequest(
-                    symbol_or_symbols="AAPL",
-                    timeframe=TimeFrame.Day,
-                    start="2024-01-01",
-                    end="2024-01-02"
-                )
-                test_bars = self.market_data_client.get_stock_bars(test_request)
-                if test_bars and "AAPL" in test_bars:
-                    print(f"--- Market data test successful: {len(test_bars['AAPL'])} bars received ---")
-                else:
-                    print("--- Market data test successful but no bars returned ---")
-            except Exception as e:
-                print(f"!!! Failed to get market data: {e!r}")
-                raise
-            
-            print(f"--- Successfully initialized both Alpaca clients ---")
+            logger.debug("--- Successfully initialized Alpaca trading client ---")
             self.api_key = api_key
             self.secret_key = secret
             self.paper = paper
             self.base_url = "https://paper-api.alpaca.markets" if paper else "https://api.alpaca.markets"
-            self._cache: Dict[str, Tuple[float, datetime]] = {}
-            self._cache_ttl = 60  # Cache TTL in seconds
+            self._cache: Dict[Hashable, Tuple[Any, float]] = {}  # key -> (value, monotonic expiry)
+            self._cache_ttl = 60  # Default cache TTL in seconds
+            self._cache_stats = Counter()  # hits / misses
+            self._account_lock = asyncio.Lock()
+            self._assets_lock = asyncio.Lock()
+            self._http: Optional[httpx.AsyncClient] = None  # Created on first direct REST call
         except Exception as e:
-            print(f"!!! FAILED to initialize Alpaca API: {e!r}")
+            logger.error("!!! FAILED to initialize Alpaca API: %r", e)
             raise HTTPException(status_code=500, detail=f"Failed to initialize Alpaca API: {str(e)}")
     
-    async def get_account_info(self):
-        print("--- Calling get_account() ---")
+    async def _call_sdk(self, bucket: str, method, *args, retry: bool = True, **kwargs):
+        """Run a blocking alpaca-py call in a thread, paced by the rate limiter.
+        Transient server errors are retried unless retry is False (use that for
+        calls that aren't safe to repeat, like submitting an order)."""
+        for attempt in range(1, HTTP_RETRY_ATTEMPTS + 1):
+            await ALPACA_RATE_LIMITER.wait(bucket)
+            try:
+                return await asyncio.to_thread(method, *args, **kwargs)
+            except APIError as e:
+                status_code = e.status_code
+                if (not retry or attempt == HTTP_RETRY_ATTEMPTS
+                        or status_code not in RETRYABLE_STATUS_CODES
+                        or status_code in SDK_RETRIED_STATUS_CODES):
+                    raise
+                delay = _retry_delay(attempt, e.response.headers.get('Retry-After'))
+                logger.warning("%s failed (%r), retrying in %.1fs", getattr(method, '__name__', method), e, delay)
+                await asyncio.sleep(delay)
+
+    async def _call_trading(self, method, *args, **kwargs):
+        """Run a blocking TradingClient call via _call_sdk."""
+        return await self._call_sdk('trading', method, *args, **kwargs)
+
+    async def _call_data(self, method, *args, **kwargs):
+        """Run a blocking market data call via _call_sdk."""
+        return await self._call_sdk('data', method, *args, **kwargs)
+
+    async def health_check(self) -> bool:
+        """Probe the trading and market data APIs. Meant to run once at startup,
+        not on every construction."""
         try:
-            account = self.trading_client.get_account()
+            account = await self._call_trading(self.trading_client.get_account)
+            logger.debug("--- Trading account status: %s ---", account.status)
+            logger.debug("--- Account equity: %s ---", account.equity)
+
+            # Try to get a single bar to test the market data connection
+            test_request = StockBarsRequest(
+                symbol_or_symbols="AAPL",
+                timeframe=TimeFrame.Day,
+                start="2024-01-01",
+                end="2024-01-02"
+            )
+            test_bars = await self._call_data(self.market_data_client.get_stock_bars, test_request)
+            if test_bars and "AAPL" in test_bars:
+                logger.debug("--- Market data test successful: %s bars received ---", len(test_bars['AAPL']))
+            else:
+                logger.debug("--- Market data test successful but no bars returned ---")
+            return True
+        except Exception as e:
+            logger.error("!!! Alpaca health check failed: %r", e)
+            return False
+
+    @property
+    def market_data_client(self) -> StockHistoricalDataClient:
+        if self._market_data_client is None:
+            logger.debug("--- Initializing Market Data Client ---")
+            self._market_data_client = StockHistoricalDataClient(
+                api_key=self.api_key,
+                secret_key=self.secret_key
+            )
+        return self._market_data_client
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client for direct REST calls, so each call reuses a warm connection."""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "APCA-API-KEY-ID": self.api_key,
+                    "APCA-API-SECRET-KEY": self.secret_key,
+                    "accept": "application/json"
+                },
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=40, keepalive_expiry=30),
+                timeout=httpx.Timeout(10.0, connect=5.0)
+            )
+        return self._http
+
+    async def aclose(self):
+        """Close the shared HTTP client."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _get_account(self, force_refresh: bool = False):
+        """Account from Alpaca, shared for a few seconds between all callers."""
+        if not force_refresh:
+            account = self._get_cached_data('account')
+            if account is not None:
+                return account
+        # Concurrent callers wait for the one refresh instead of each issuing their own
+        async with self._account_lock:
+            if not force_refresh:
+                account = self._get_cached_data('account')
+                if account is not None:
+                    return account
+            logger.debug("--- Fetching account via HTTP ---")
+            response = await self._get_with_retry("/v2/account")
+            account = TradeAccount(**orjson.loads(response.content))
+            self._set_cached_data('account', account, ACCOUNT_CACHE_TTL)
+            return account
+
+    async def get_account_info(self, force_refresh: bool = False):
+        try:
+            account = await self._get_account(force_refresh)
             return {
                 "account_number": account.account_number,
                 "status": account.status,
@@ -107,54 +342,98 @@ class AlpacaService:
                 "paper_trading": self.paper
             }
         except Exception as e:
-            logger.error(f"!!! Exception during Alpaca get_account: {e!r}")
+            logger.error("!!! Exception during Alpaca get_account: %r", e)
             raise HTTPException(status_code=400, detail=str(e))
 
-    async def place_order(self, symbol: str, qty: float, side: str, time_in_force: str = 'day'):
-        """Place a market order with string parameters."""
-        print(f"--- Placing order for {symbol}: {side} {qty} shares ---")
+    async def place_order(
+        self,
+        symbol: str,
+        quantity: float,
+        side: Union[str, OrderSide],
+        time_in_force: str = 'day',
+        return_model: bool = False
+    ):
+        """Place a market order. Returns the order as a dict, or as a Trade when return_model is set."""
+        logger.debug("--- Placing order for %s: %s %s shares ---", symbol, side, quantity)
         try:
             # Verify trading client is initialized
             if not hasattr(self, 'trading_client'):
                 raise ValueError("Trading client not initialized")
             
-            # Convert side string to OrderSide enum
-            order_side = OrderSide.BUY if side.lower() == 'buy' else OrderSide.SELL
+            # Accept either an OrderSide or a 'buy'/'sell' string
+            order_side = side if isinstance(side, OrderSide) else ORDER_SIDE_MAP.get(side.lower())
+            if order_side is None:
+                raise ValueError(f"Unsupported order side: {side}")
             
-            # Convert time_in_force string to TimeInForce enum
-            order_time_in_force = TimeInForce.DAY if time_in_force.lower() == 'day' else TimeInForce.GTC
+            # Anything other than 'day' has always been sent as GTC
+            order_time_in_force = TIME_IN_FORCE_MAP.get(time_in_force.lower(), TimeInForce.GTC)
             
-            # Create a MarketOrderRequest object
-            order_request = MarketOrderRequest(
+            if quantity <= 0:
+                raise ValueError(f"Order quantity must be positive, got {quantity}")
+
+            # Every field is already resolved to its final type above, so skip
+            # pydantic's re-validation of the request
+            order_request = MarketOrderRequest.model_construct(
                 symbol=symbol,
-                qty=qty,
+                qty=float(quantity),
                 side=order_side,
+                type=OrderType.MARKET,
                 time_in_force=order_time_in_force
             )
             
             # Submit the order using the request object
-            order = self.trading_client.submit_order(order_data=order_request)
+            order = await self._call_trading(self.trading_client.submit_order, order_data=order_request, retry=False)
             
-            print(f"--- Order submitted successfully: {order} ---")
+            logger.debug("--- Order submitted successfully: %s ---", order.id)
             
-            # Create and return a Trade object
-            return Trade(
-                symbol=symbol,
-                type=TradeType.BUY if order_side == OrderSide.BUY else TradeType.SELL,
-                quantity=float(qty),
-                price=float(order.filled_avg_price) if order.filled_avg_price else None,
-                status=TradeStatus.FILLED if order.status == 'filled' else TradeStatus.PENDING,
-                timestamp=datetime.utcnow()
-            )
+            if return_model:
+                return Trade(
+                    symbol=symbol,
+                    quantity=float(quantity),
+                    price=float(order.filled_avg_price) if order.filled_avg_price else None,
+                    side=TradeType.BUY if order_side == OrderSide.BUY else TradeType.SELL,
+                    status=TradeStatus.FILLED if order.status == 'filled' else TradeStatus.PENDING,
+                    order_id=str(order.id),
+                    created_at=datetime.utcnow()
+                )
+            return {
+                "order_id": str(order.id),
+                "client_order_id": order.client_order_id,
+                "status": order.status,
+                "symbol": order.symbol,
+                "qty": str(order.qty),
+                "filled_qty": str(order.filled_qty),
+                "filled_avg_price": str(order.filled_avg_price) if order.filled_avg_price else None
+            }
         except Exception as e:
-            logger.error(f"!!! Exception during place_order: {e!r}")
+            logger.error("!!! Exception during place_order: %r", e)
             raise HTTPException(status_code=400, detail=str(e))
 
+    async def place_orders(self, orders: List[Dict[str, Any]]) -> List[Optional[Trade]]:
+        """Place several market orders concurrently. Each order is a dict of
+        place_order arguments (symbol, quantity, side, optional time_in_force).
+        Returns a Trade per order, in order, with None where that order failed."""
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SDK_CALLS)
+
+        async def submit(order: Dict[str, Any]):
+            async with semaphore:
+                return await self.place_order(**order, return_model=True)
+
+        results = await asyncio.gather(*(submit(order) for order in orders), return_exceptions=True)
+        trades: List[Optional[Trade]] = []
+        for order, result in zip(orders, results):
+            if isinstance(result, BaseException):
+                logger.error("!!! Order for %s failed: %r", order.get('symbol'), result)
+                trades.append(None)
+            else:
+                trades.append(result)
+        return trades
+
     async def get_order_status(self, order_id: str):
         """Get the status of a specific order."""
-        print(f"--- Getting order status for {order_id} ---")
+        logger.debug("--- Getting order status for %s ---", order_id)
         try:
-            order = self.trading_client.get_order_by_id(order_id)
+            order = await self._call_trading(self.trading_client.get_order_by_id, order_id)
             return {
                 "order_id": order.id,
                 "client_order_id": order.client_order_id,
@@ -165,14 +444,14 @@ class AlpacaService:
                 "symbol": order.symbol
             }
         except Exception as e:
-            logger.error(f"!!! Exception during get_order_status: {e!r}")
+            logger.error("!!! Exception during get_order_status: %r", e)
             raise HTTPException(status_code=400, detail=str(e))
 
     async def get_open_orders(self):
         """Get all open orders."""
-        print("--- Getting open orders ---")
+        logger.debug("--- Getting open orders ---")
         try:
-            orders = self.trading_client.get_orders(status='open')
+            orders = await self._call_trading(self.trading_client.get_orders, status='open')
             return [{
                 "order_id": order.id,
                 "client_order_id": order.client_order_id,
@@ -183,24 +462,24 @@ class AlpacaService:
                 "filled_avg_price": str(order.filled_avg_price) if order.filled_avg_price else None
             } for order in orders]
         except Exception as e:
-            logger.error(f"!!! Exception during get_open_orders: {e!r}")
+            logger.error("!!! Exception during get_open_orders: %r", e)
             raise HTTPException(status_code=400, detail=str(e))
 
     async def cancel_order(self, order_id: str):
         """Cancel a specific order."""
-        print(f"--- Cancelling order {order_id} ---")
+        logger.debug("--- Cancelling order %s ---", order_id)
         try:
-            self.trading_client.cancel_order_by_id(order_id)
+            await self._call_trading(self.trading_client.cancel_order_by_id, order_id)
             return {"status": "cancelled", "order_id": order_id}
         except Exception as e:
-            logger.error(f"!!! Exception during cancel_order: {e!r}")
+            logger.error("!!! Exception during cancel_order: %r", e)
             raise HTTPException(status_code=400, detail=str(e))
 
     async def get_assets(self):
         """Get all tradable assets."""
-        print("--- Getting tradable assets ---")
+        logger.debug("--- Getting tradable assets ---")
         try:
-            assets = self.trading_client.get_all_assets()
+            assets = await self._call_trading(self.trading_client.get_all_assets)
             return [{
                 "id": asset.id,
                 "symbol": asset.symbol,
@@ -213,188 +492,379 @@ class AlpacaService:
                 "fractionable": asset.fractionable
             } for asset in assets if asset.tradable]
         except Exception as e:
-            logger.error(f"!!! Exception during get_assets: {e!r}")
+            logger.error("!!! Exception during get_assets: %r", e)
             raise HTTPException(status_code=400, detail=str(e))
 
-    def _get_cached_data(self, key: str) -> Optional[float]:
-        if key in self._cache:
-            value, timestamp = self._cache[key]
-            if (datetime.now(timezone.utc) - timestamp).total_seconds() < self._cache_ttl:
+    async def _get_tradable_symbols(self) -> frozenset:
+        """Symbols of every tradable asset, fetched in one call and shared for hours."""
+        symbols = self._get_cached_data('tradable_symbols')
+        if symbols is not None:
+            return symbols
+        async with self._assets_lock:
+            symbols = self._get_cached_data('tradable_symbols')
+            if symbols is not None:
+                return symbols
+            logger.debug("--- Calling get_all_assets() ---")
+            assets = await self._call_trading(self.trading_client.get_all_assets)
+            symbols = frozenset(asset.symbol for asset in assets if asset.tradable)
+            self._set_cached_data('tradable_symbols', symbols, TRADABLE_SYMBOLS_CACHE_TTL)
+            return symbols
+
+    def _get_cached_data(self, key: Hashable) -> Optional[Any]:
+        entry = self._cache.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if time.monotonic() < expires_at:
+                self._cache_stats['hits'] += 1
                 return value
             del self._cache[key]
+        self._cache_stats['misses'] += 1
         return None
 
-    def _set_cached_data(self, key: str, value: float):
-        self._cache[key] = (value, datetime.now(timezone.utc))
+    def _set_cached_data(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        now = time.monotonic()
+        if len(self._cache) >= MAX_CACHE_ENTRIES:
+            # Drop expired entries, then the oldest if still full
+            self._cache = {k: entry for k, entry in self._cache.items() if entry[1] > now}
+            if len(self._cache) >= MAX_CACHE_ENTRIES:
+                del self._cache[next(iter(self._cache))]
+        self._cache[key] = (value, now + (self._cache_ttl if ttl is None else ttl))
 
-    @lru_cache(maxsize=100)
     async def get_historical_bars(
         self, 
-        symbol: str, 
+        symbol: Union[str, List[str]], 
         timeframe: str = '1D', 
         lookback_days: int = None,
         start_date: datetime = None,
         end_date: datetime = None,
-        limit: int = 1000
+        limit: int = 1000,
+        force_refresh: bool = False
     ):
-        print(f"--- Getting historical bars for {symbol} with timeframe={timeframe} ---")
+        """Get bars as a list of dicts for one symbol, or a dict of such lists
+        keyed by symbol when given a list (fetched in as few requests as possible)."""
+        symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+        # Key on the arguments as given: a rolling lookback resolves to a new end time on every call
+        cache_key = ('bars', symbol if isinstance(symbol, str) else tuple(symbols), timeframe, lookback_days, start_date, end_date, limit)
+        if not force_refresh:
+            cached = self._get_cached_data(cache_key)
+            if cached is not None:
+                return cached
+        fixed_range = start_date is not None and end_date is not None
+        logger.debug("--- Getting historical bars for %s with timeframe=%s ---", symbols, timeframe)
         try:
             # Convert timeframe string to TimeFrame object
-            if timeframe == '1D':
-                tf = TimeFrame.Day
-            elif timeframe == '1H':
-                tf = TimeFrame.Hour
-            elif timeframe == '15Min':
-                tf = TimeFrame(15, TimeFrameUnit.Minute)
-            elif timeframe == '5Min':
-                tf = TimeFrame(5, TimeFrameUnit.Minute)
-            elif timeframe == '1Min':
-                tf = TimeFrame(1, TimeFrameUnit.Minute)
-            else:
-                raise ValueError(f"Unsupported timeframe: {timeframe}")
+            tf = TIMEFRAME_MAP.get(timeframe)
+            if tf is None:
+                raise ValueError(f"Unsupported timeframe: {timeframe}. Supported: {SUPPORTED_TIMEFRAMES}")
             
-            print(f"--- Mapped timeframe string '{timeframe}' to TimeFrame object: {tf} ---")
+            logger.debug("--- Mapped timeframe string '%s' to TimeFrame object: %s ---", timeframe, tf)
 
             # Calculate date range
             if start_date is None or end_date is None:
-                end_date = datetime.now(timezone.utc) - timedelta(minutes=15)  # Add 15-minute delay
-                if lookback_days is not None:
-                    start_date = end_date - timedelta(days=lookback_days)
-                else:
-                    start_date = end_date - timedelta(days=30)  # Default to 30 days
-            
-            print(f"--- Fetching data from {start_date} to {end_date} ---")
-            
-            # Create request parameters for historical bars
-            request_params = StockBarsRequest(
-                symbol_or_symbols=[symbol],  # Pass as list
-                timeframe=tf,
-                start=start_date,
-                end=end_date,
-                limit=limit,
-                feed='iex'  # Use IEX feed for better compatibility
-            )
-            
-            print(f"--- Request parameters constructed: {request_params} ---")
-            
-            # Get the historical bars
-            bars_response = self.market_data_client.get_stock_bars(request_params)
-            print(f"--- Raw response type: {type(bars_response)} ---")
+                start_date, end_date = _rolling_window(lookback_days if lookback_days is not None else 30)  # Default to 30 days
             
-            if not bars_response or symbol not in bars_response:
-                raise HTTPException(status_code=400, detail=f"No bars data returned for symbol {symbol}")
+            logger.debug("--- Fetching data from %s to %s ---", start_date, end_date)
             
-            # Extract bars for the symbol
-            bars = bars_response[symbol]
-            print(f"--- Number of bars received for {symbol}: {len(bars)} ---")
-            
-            # Convert bars to a list of dictionaries with the correct attributes
-            processed_bars = []
-            for bar in bars:
-                processed_bars.append({
-                    'timestamp': bar.timestamp,
-                    'open': float(bar.open),
-                    'high': float(bar.high),
-                    'low': float(bar.low),
-                    'close': float(bar.close),
-                    'volume': float(bar.volume)
-                })
-            
-            return processed_bars
+            # Fixed ranges can be served from disk across restarts
+            bars_by_symbol: Optional[Dict[str, List[Dict]]] = None
+            file_key = None
+            if fixed_range:
+                file_key = FileCache.make_key(','.join(symbols), timeframe, start_date, end_date, limit)
+                if not force_refresh:
+                    bars_by_symbol = await asyncio.to_thread(_read_cached_bars, file_key)
+
+            if bars_by_symbol is None:
+                bars_by_symbol = await self._fetch_bars(symbols, tf, start_date, end_date, limit)
+                if file_key is not None and bars_by_symbol:
+                    end_utc = end_date if end_date.tzinfo else end_date.replace(tzinfo=timezone.utc)
+                    settled = datetime.now(timezone.utc) - end_utc >= timedelta(days=SETTLED_BARS_AGE_DAYS)
+                    await asyncio.to_thread(_write_cached_bars, file_key, bars_by_symbol, None if settled else FILE_CACHE_TTL)
+
+            if isinstance(symbol, str):
+                if symbol not in bars_by_symbol:
+                    raise HTTPException(status_code=400, detail=f"No bars data returned for symbol {symbol}")
+                result = bars_by_symbol[symbol]
+            else:
+                result = bars_by_symbol
+            if fixed_range and timeframe == '1D':
+                ttl = FIXED_RANGE_DAILY_BARS_CACHE_TTL
+            else:
+                ttl = BARS_CACHE_TTL_BY_TIMEFRAME.get(timeframe, BARS_CACHE_TTL)
+            self._set_cached_data(cache_key, result, ttl)
+            return result
 
         except Exception as e:
-            print(f"!!! Error getting historical bars: {e!r}")
+            logger.error("!!! Error getting historical bars: %r", e)
             raise HTTPException(status_code=400, detail=str(e))
 
+    async def _fetch_bars(self, symbols: List[str], tf: TimeFrame, start_date: datetime, end_date: datetime, limit: int) -> Dict[str, List[Dict]]:
+        """Request bars from the data API in chunks of symbols, building the dicts
+        straight from the JSON rather than through the SDK's per-bar models."""
+        bars_by_symbol: Dict[str, List[Dict]] = {}
+        for i in range(0, len(symbols), MAX_SYMBOLS_PER_BARS_REQUEST):
+            chunk = symbols[i:i + MAX_SYMBOLS_PER_BARS_REQUEST]
+            raw_bars = await self._get_bar_pages(chunk, tf, start_date, end_date, limit)
+
+            for sym, bars in raw_bars.items():
+                logger.debug("--- Number of bars received for %s: %s ---", sym, len(bars))
+                bars_by_symbol[sym] = [{
+                    'timestamp': datetime.fromisoformat(bar['t']),
+                    'open': bar['o'],
+                    'high': bar['h'],
+                    'low': bar['l'],
+                    'close': bar['c'],
+                    'volume': float(bar['v'])
+                } for bar in bars]
+        return bars_by_symbol
+
+    async def _get_bar_pages(self, symbols: List[str], tf: TimeFrame, start_date: datetime, end_date: datetime, limit: int) -> Dict[str, List[Dict]]:
+        """Raw bar JSON objects keyed by symbol: the newest `limit` bars of each, oldest first.
+
+        The request limit caps bars across all symbols and multi-symbol responses are
+        grouped by symbol, so one busy symbol can fill whole pages. Bars are requested
+        newest first and pages followed until every symbol has `limit` bars or the
+        range is exhausted."""
+        params: Dict[str, Any] = {
+            "symbols": ",".join(symbols),
+            "timeframe": tf.value,
+            "start": _rfc3339(start_date),
+            "end": _rfc3339(end_date),
+            "feed": "iex",  # Use IEX feed for better compatibility
+            "sort": "desc",
+            "limit": min(limit * len(symbols), BARS_PAGE_LIMIT),
+        }
+        bars: Dict[str, List[Dict]] = {}
+        while True:
+            response = await self._get_with_retry(f"{DATA_BASE_URL}/v2/stocks/bars", params=params, bucket='data')
+            payload = orjson.loads(response.content)
+            for sym, page in (payload.get('bars') or {}).items():
+                sym_bars = bars.setdefault(sym, [])
+                sym_bars.extend(page[:limit - len(sym_bars)])
+            page_token = payload.get('next_page_token')
+            if not page_token or (len(bars) == len(symbols) and all(len(b) >= limit for b in bars.values())):
+                break
+            params["page_token"] = page_token
+        for sym_bars in bars.values():
+            sym_bars.reverse()
+        return bars
+
+    async def get_bars_since(self, symbol: str, timeframe: str, since: datetime, limit: int = 1000) -> List[Dict]:
+        """Bars for one symbol from `since` (inclusive) up to the IEX delay, uncached.
+        Meant for incremental polling, where callers already hold the older bars."""
+        tf = TIMEFRAME_MAP.get(timeframe)
+        if tf is None:
+            raise ValueError(f"Unsupported timeframe: {timeframe}. Supported: {SUPPORTED_TIMEFRAMES}")
+        _, end_date = _rolling_window(0)
+        if since >= end_date:
+            return []
+        bars_by_symbol = await self._fetch_bars([symbol], tf, since, end_date, limit)
+        return bars_by_symbol.get(symbol, [])
+
+    async def get_close_prices(
+        self,
+        symbol: Union[str, List[str]],
+        timeframe: str = '1D',
+        lookback_days: int = None,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        limit: int = 1000,
+        dtype=np.float64
+    ) -> Union[np.ndarray, Dict[str, np.ndarray]]:
+        """Closing prices from get_historical_bars as NumPy arrays (one per symbol for a list)."""
+        bars = await self.get_historical_bars(symbol, timeframe, lookback_days, start_date, end_date, limit)
+        if isinstance(symbol, str):
+            return np.fromiter((bar['close'] for bar in bars), dtype=dtype, count=len(bars))
+        return {
+            sym: np.fromiter((bar['close'] for bar in sym_bars), dtype=dtype, count=len(sym_bars))
+            for sym, sym_bars in bars.items()
+        }
+
+    async def get_bars_frame(
+        self,
+        symbol: str,
+        timeframe: str = '1D',
+        lookback_days: int = None,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        limit: int = 1000
+    ) -> pd.DataFrame:
+        """Bars for one symbol as a timestamp-indexed DataFrame with float64 columns."""
+        bars = await self.get_historical_bars(symbol, timeframe, lookback_days, start_date, end_date, limit)
+        columns = _bars_columns(bars)
+        return pd.DataFrame(
+            {field: columns[field] for field in BAR_PRICE_FIELDS},
+            index=columns['timestamp'].rename('timestamp'),
+            copy=False
+        )
+
     async def get_latest_price(self, symbol: str) -> Optional[float]:
         """Fetches the latest ask price for a given stock symbol with caching."""
-        print(f"--- Fetching latest quote for {symbol} ---")
+        return (await self.get_latest_prices([symbol])).get(symbol)
+
+    async def get_latest_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """Latest ask prices keyed by symbol. Cached prices are reused and the rest
+        are fetched in a single quote request; symbols without a quote are left out."""
+        logger.debug("--- Fetching latest quotes for %s ---", symbols)
+        prices: Dict[str, float] = {}
+        missing: List[str] = []
+        now = time.monotonic()
+        for symbol in dict.fromkeys(symbols):
+            entry = _latest_prices.get(symbol)
+            if entry is not None and now < entry[1]:
+                prices[symbol] = entry[0]
+            else:
+                missing.append(symbol)
+        self._cache_stats['price_hits'] += len(prices)
+        self._cache_stats['price_misses'] += len(missing)
+        if not missing:
+            return prices
+
         try:
-            # Check cache first
-            cached_price = self._get_cached_data(f"price_{symbol}")
-            if cached_price is not None:
-                print(f"--- Using cached price for {symbol}: {cached_price} ---")
-                return cached_price
-
-            if not hasattr(self, 'market_data_client'):
-                raise ValueError("Market data client not initialized")
-            
-            request_params = StockLatestQuoteRequest(symbol_or_symbols=symbol)
-            latest_quote_response = self.market_data_client.get_stock_latest_quote(request_params)
-            
-            quote = latest_quote_response.get(symbol)
-            
+            response = await self._get_with_retry(
+                f"{DATA_BASE_URL}/v2/stocks/quotes/latest",
+                params={"symbols": ",".join(missing)},
+                bucket='data'
+            )
+            latest_quotes = orjson.loads(response.content).get('quotes') or {}
+        except Exception as e:
+            logger.error("!!! Exception fetching latest quotes for %s: %r", missing, e)
+            return prices
+
+        expires_at = time.monotonic() + PRICE_CACHE_TTL
+        for symbol in missing:
+            quote = latest_quotes.get(symbol)
             if not quote:
-                logger.warning(f"Could not get latest quote for {symbol}")
-                return None
-            
-            latest_price = quote.ask_price
-            print(f"--- Latest ask price for {symbol}: {latest_price} ---")
-            
-            # Cache the price
-            self._set_cached_data(f"price_{symbol}", float(latest_price))
-            
-            return float(latest_price)
+                logger.warning("Could not get latest quote for %s", symbol)
+                continue
+            latest_price = float(quote['ap'])  # Ask price
+            logger.debug("--- Latest ask price for %s: %s ---", symbol, latest_price)
+            _latest_prices.pop(symbol, None)  # Re-insert so insertion order tracks age
+            _latest_prices[symbol] = (latest_price, expires_at)
+            prices[symbol] = latest_price
+        while len(_latest_prices) > MAX_PRICE_CACHE_ENTRIES:
+            del _latest_prices[next(iter(_latest_prices))]
+        return prices
 
-        except Exception as e:
-            logger.error(f"!!! Exception fetching latest quote for {symbol}: {e!r}")
-            return None
+    @staticmethod
+    def _to_position(symbol: str, position, now: Optional[datetime] = None) -> Position:
+        if now is None:
+            now = datetime.utcnow()
+        return Position(
+            symbol=symbol,
+            quantity=float(position.qty),
+            entry_price=float(position.avg_entry_price),
+            current_price=float(position.current_price),
+            status=PositionStatus.OPEN,
+            entry_time=now,  # Alpaca positions don't carry an open time
+            last_updated=now,
+            unrealized_pnl=float(position.unrealized_pl)
+        )
 
     async def get_position(self, symbol: str) -> Optional[Position]:
         """Get the current position for a symbol."""
         try:
-            position = self.trading_client.get_position(symbol)
+            position = await self._call_trading(self.trading_client.get_position, symbol)
             if position:
-                return Position(
-                    symbol=symbol,
-                    quantity=float(position.qty),
-                    entry_price=float(position.avg_entry_price),
-                    current_price=float(position.current_price),
-                    status=PositionStatus.OPEN,
-                    timestamp=datetime.utcnow()
-                )
+                return self._to_position(symbol, position)
             return None
         except Exception as e:
-            logger.error(f"Error getting position for {symbol}: {str(e)}")
+            logger.error("Error getting position for %s: %s", symbol, e)
             return None
 
+    async def get_positions(self, symbols: Optional[List[str]] = None) -> Dict[str, Optional[Position]]:
+        """Get positions for several symbols concurrently, or every open position when
+        symbols is None. A symbol maps to None only when Alpaca reports no position (404);
+        symbols whose read failed for any other reason (timeouts, rate limits, auth) are
+        left out, so callers keep what they knew."""
+        if symbols is None:
+            raw_positions = await self._call_trading(self.trading_client.get_all_positions)
+            now = datetime.utcnow()
+            return {p.symbol: self._to_position(p.symbol, p, now) for p in raw_positions}
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SDK_CALLS)
+
+        async def fetch(symbol: str):
+            async with semaphore:
+                return await self._call_trading(self.trading_client.get_position, symbol)
+
+        results = await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+        positions: Dict[str, Optional[Position]] = {}
+        now = datetime.utcnow()  # One timestamp for the whole batch
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, APIError) and result.status_code == 404:
+                positions[symbol] = None  # No open position comes back as a 404
+            elif isinstance(result, Exception):
+                logger.error("Error getting position for %s: %s", symbol, result)
+            elif isinstance(result, BaseException):
+                raise result
+            elif result:
+                positions[symbol] = self._to_position(symbol, result, now)
+            else:
+                positions[symbol] = None
+        return positions
+
     async def close_position(self, symbol: str) -> Optional[Trade]:
         """Close an existing position."""
         try:
             position = await self.get_position(symbol)
             if not position:
-                logger.warning(f"No position found for {symbol}")
+                logger.warning("No position found for %s", symbol)
                 return None
             
             # Place an order to close the position
             side = OrderSide.SELL if position.quantity > 0 else OrderSide.BUY
-            return await self.place_order(symbol, abs(position.quantity), side)
+            return await self.place_order(symbol, abs(position.quantity), side, return_model=True)
             
         except Exception as e:
-            logger.error(f"Error closing position for {symbol}: {str(e)}")
+            logger.error("Error closing position for %s: %s", symbol, e)
             return None
 
     async def get_account_balance(self) -> float:
         """Get the current account balance."""
         try:
-            account = self.trading_client.get_account()
+            account = await self._get_account()
             return float(account.cash)
         except Exception as e:
-            logger.error(f"Error getting account balance: {str(e)}")
+            logger.error("Error getting account balance: %s", e)
             return 0.0 
 
+    async def _get_with_retry(self, path: str, params: Optional[Dict[str, Any]] = None, bucket: str = 'trading') -> httpx.Response:
+        """GET on the shared client, retrying network errors and RETRYABLE_STATUS_CODES
+        with exponential backoff (or the server's Retry-After). Other errors are
+        raised immediately. Paths are relative to the trading API; pass a full
+        URL (and bucket='data') for the market data API."""
+        client = self._get_http_client()  # Auth headers, base URL and timeout are set on the shared client
+        for attempt in range(1, HTTP_RETRY_ATTEMPTS + 1):
+            try:
+                await ALPACA_RATE_LIMITER.wait(bucket)
+                response = await client.get(path, params=params)
+                logger.debug("--- GET %s -> %s (attempt %s) ---", path, response.status_code, attempt)
+                response.raise_for_status()  # Raises HTTPStatusError for 4xx/5xx responses
+                return response
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                transport_error = isinstance(e, httpx.TransportError)
+                retryable = transport_error or e.response.status_code in RETRYABLE_STATUS_CODES
+                if not retryable or attempt == HTTP_RETRY_ATTEMPTS:
+                    raise
+                delay = _retry_delay(attempt, None if transport_error else e.response.headers.get('Retry-After'))
+                logger.warning("GET %s failed (%r), retrying in %.1fs", path, e, delay)
+                await asyncio.sleep(delay)
+
     async def get_portfolio_history(
         self,
         period: str = "1M",
         timeframe: Optional[str] = None,
         date_end: Optional[datetime] = None,
-        extended_hours: bool = False
+        extended_hours: bool = False,
+        force_refresh: bool = False
     ) -> Optional[PortfolioHistory]:
         """Fetches portfolio history from Alpaca API using a direct HTTP request."""
-        print(f"--- Fetching portfolio history via HTTP (period={period}, timeframe={timeframe}) ---")
-        
-        # Construct the API endpoint URL
-        endpoint = f"{self.base_url}/v2/account/portfolio/history"
+        cache_key = ('portfolio_history', period, timeframe, date_end, extended_hours)
+        if not force_refresh:
+            cached = self._get_cached_data(cache_key)
+            if cached is not None:
+                return cached
+        logger.debug("--- Fetching portfolio history via HTTP (period=%s, timeframe=%s) ---", period, timeframe)
         
         # Prepare query parameters, filtering out None values
         params = {
@@ -405,79 +875,66 @@ class AlpacaService:
         }
         query_params = {k: v for k, v in params.items() if v is not None}
         
-        # Prepare headers
-        headers = {
-            "APCA-API-KEY-ID": self.api_key,
-            "APCA-API-SECRET-KEY": self.secret_key,
-            "accept": "application/json"
-        }
-        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(endpoint, params=query_params, headers=headers)
-                
-            # Log status code
-            print(f"--- Portfolio History API Response Status: {response.status_code} ---")
-            
-            # Check for successful response
-            response.raise_for_status() # Raises HTTPStatusError for 4xx/5xx responses
+            response = await self._get_with_retry("/v2/account/portfolio/history", params=query_params)
             
             # Parse the JSON response
-            data = response.json()
-            print(f"--- Portfolio History API Raw JSON Response: {data} ---")
-            
+            # orjson parses the numeric arrays much faster than the stdlib decoder
+            data = orjson.loads(response.content)
             # Construct the PortfolioHistory object from the response data
             # Handle potential None values if API response fields are optional
             history = PortfolioHistory(
-                timestamp=data.get('timestamp', []),
-                equity=data.get('equity', []),
-                profit_loss=data.get('profit_loss', []),
-                profit_loss_pct=data.get('profit_loss_pct', []),
-                base_value=data.get('base_value', 0.0), # Provide default if missing
-                timeframe=data.get('timeframe', '') # Provide default if missing
+                timestamp=data.get('timestamp') or [],
+                equity=data.get('equity') or [],
+                profit_loss=data.get('profit_loss') or [],
+                profit_loss_pct=data.get('profit_loss_pct') or [],
+                base_value=data.get('base_value') or 0.0, # Provide default if missing
+                timeframe=data.get('timeframe') or '' # Provide default if missing
                 # Add other fields if they exist in the API response and model
             )
             
-            print(f"--- Successfully parsed portfolio history. Timestamps: {len(history.timestamp)}, Equity points: {len(history.equity)} ---")
+            logger.debug("--- Successfully parsed portfolio history. Timestamps: %s, Equity points: %s ---", len(history.timestamp), len(history.equity))
+            self._set_cached_data(cache_key, history, PORTFOLIO_HISTORY_CACHE_TTL)
             return history
             
         except httpx.HTTPStatusError as e:
             # Log HTTP errors (e.g., 401 Unauthorized, 404 Not Found, 400 Bad Request)
-            logger.error(f"!!! HTTP Error fetching portfolio history: {e.response.status_code} - {e.response.text}")
+            logger.error("!!! HTTP Error fetching portfolio history: %s - %s", e.response.status_code, e.response.text)
             return None
         except httpx.RequestError as e:
             # Log other request errors (e.g., network issues)
-            logger.error(f"!!! Request Error fetching portfolio history: {e!r}")
+            logger.error("!!! Request Error fetching portfolio history: %r", e)
             return None
         except Exception as e:
             # Catch-all for other unexpected errors (e.g., JSON parsing)
-            logger.error(f"!!! Unexpected error processing portfolio history: {e!r}")
+            logger.error("!!! Unexpected error processing portfolio history: %r", e)
+            return None
+
+    async def get_portfolio_history_arrays(self, period: str = "1M", timeframe: Optional[str] = None, **kwargs) -> Optional[PortfolioHistoryArrays]:
+        """get_portfolio_history as contiguous arrays for vectorised analytics.
+        Values stay float64: equity needs cent precision, which float32 loses above ~$100k.
+        Missing points (null in the API response) become NaN."""
+        history = await self.get_portfolio_history(period, timeframe, **kwargs)
+        if history is None:
             return None
+        return PortfolioHistoryArrays(
+            timestamp=np.asarray(history.timestamp, dtype=np.int64),
+            equity=np.asarray(history.equity, dtype=np.float64),
+            profit_loss=np.asarray(history.profit_loss, dtype=np.float64),
+            profit_loss_pct=np.asarray(history.profit_loss_pct, dtype=np.float64),
+            base_value=float(history.base_value),
+            timeframe=history.timeframe
+        )
 
     async def is_asset_valid(self, symbol: str) -> bool:
         """Checks if an asset symbol exists and is tradable on Alpaca."""
-        print(f"--- Validating asset symbol: {symbol} ---")
+        logger.debug("--- Validating asset symbol: %s ---", symbol)
         try:
-            if not hasattr(self, 'trading_client'):
-                logger.error("Trading client not initialized during asset validation.")
-                return False # Or raise an internal error
-            
-            asset = self.trading_client.get_asset(symbol)
-            if asset and asset.tradable:
-                print(f"--- Asset {symbol} is valid and tradable. Status: {asset.status} ---")
-                return True
-            else:
-                status = asset.status if asset else 'Not Found'
-                tradable_status = asset.tradable if asset else 'N/A'
-                logger.warning(f"Asset {symbol} is not valid/tradable. Status: {status}, Tradable: {tradable_status}")
-                return False
-        except APIError as e:
-             # Specifically catch APIError for cases like 404 Not Found
-             if e.status_code == 404:
-                 logger.warning(f"Asset {symbol} not found on Alpaca.")
-             else:
-                 logger.error(f"!!! API Error validating asset {symbol}: {e!r}")
-             return False
+            tradable_symbols = await self._get_tradable_symbols()
         except Exception as e:
-            logger.error(f"!!! Unexpected error validating asset {symbol}: {e!r}")
-            return False # Treat unexpected errors as invalid for safety
\ No newline at end of file
+            logger.error("!!! Error loading tradable assets, validating %s: %r", symbol, e)
+            return False # Treat unexpected errors as invalid for safety
+        if symbol in tradable_symbols:
+            return True
+        logger.warning("Asset %s is not found or not tradable on Alpaca.", symbol)
+        return False
\ No newline at end of file
@@ -1,85 +1,166 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import User, Algorithm, AlgorithmType
 import os
 from dotenv import load_dotenv
 import uuid
+import logging
+import time
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Security configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+DEFAULT_TOKEN_LIFETIME_SECONDS = 15 * 60  # When create_access_token gets no expires_delta
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt only uses the first 72 bytes of a password. passlib truncated longer ones
+# silently, so hashes it produced only verify against the truncated bytes
+BCRYPT_MAX_PASSWORD_BYTES = 72
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Claims every access token must carry, checked while decoding
+JWT_DECODE_OPTIONS = {"require_exp": True, "require_sub": True, "verify_aud": False}
+
+# Verified tokens are reused for a short while so repeat requests skip the HMAC check
+DECODED_TOKEN_CACHE_TTL = 60
+MAX_DECODED_TOKENS = 10_000
+_decoded_tokens: Dict[str, Tuple[str, float]] = {}  # token -> (email, monotonic expiry), oldest first
+
+# Dialect-specific INSERTs that support ON CONFLICT DO NOTHING
+_CONFLICT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+# email -> user id, so authenticated requests load the user by primary key
+USER_ID_CACHE_TTL = 30
+MAX_CACHED_USER_IDS = 10_000
+_user_ids: Dict[str, Tuple[str, float]] = {}  # email -> (user id, monotonic expiry), oldest first
+
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    """User with this email, or None. The id is remembered briefly; the row
+    itself is always read through the caller's session."""
+    now = time.monotonic()
+    cached = _user_ids.get(email)
+    if cached is not None and now < cached[1]:
+        user = db.get(User, cached[0])
+        if user is not None and user.email == email:
+            return user
+    _user_ids.pop(email, None)
+
+    user = db.execute(select(User).where(User.email == email)).scalar_one_or_none()
+    if user is not None:
+        if len(_user_ids) >= MAX_CACHED_USER_IDS:
+            del _user_ids[next(iter(_user_ids))]
+        _user_ids[email] = (user.id, now + USER_ID_CACHE_TTL)
+    return user
+
+def decode_access_token(token: str) -> str:
+    """Email (the "sub" claim) of a valid access token; raises JWTError otherwise."""
+    now = time.monotonic()
+    cached = _decoded_tokens.get(token)
+    if cached is not None:
+        if now < cached[1]:
+            return cached[0]
+        del _decoded_tokens[token]
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options=JWT_DECODE_OPTIONS)
+    email = payload["sub"]
+    # Never keep a token past its own expiry
+    ttl = min(DECODED_TOKEN_CACHE_TTL, payload["exp"] - time.time())
+    if ttl > 0:
+        if len(_decoded_tokens) >= MAX_DECODED_TOKENS:
+            del _decoded_tokens[next(iter(_decoded_tokens))]
+        _decoded_tokens[token] = (email, now + ttl)
+    return email
+
 class AuthService:
+    """DB-backed user operations. Password hashing and token helpers are static,
+    so they can be used without a request-scoped session.
+
+    bcrypt is CPU-heavy: call the password helpers from sync endpoints (which
+    FastAPI runs in its threadpool) or through asyncio.to_thread, never directly
+    inside an async handler."""
+
     def __init__(self, db: Session):
         self.db = db
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+    @staticmethod
+    def verify_password(plain_password: str, hashed_password: str) -> bool:
+        try:
+            return bcrypt.checkpw(
+                plain_password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES],
+                hashed_password.encode("utf-8")
+            )
+        except ValueError:  # Malformed or non-bcrypt hash
+            return False
 
-    def get_password_hash(self, password: str) -> str:
-        return pwd_context.hash(password)
+    @staticmethod
+    def get_password_hash(password: str) -> str:
+        return bcrypt.hashpw(password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES], bcrypt.gensalt()).decode("ascii")
 
-    def create_access_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    @staticmethod
+    def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
         to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=15)
-        to_encode.update({"exp": expire})
+        # exp as integer epoch seconds: unambiguous UTC, no datetime round-trip
+        lifetime = expires_delta.total_seconds() if expires_delta else DEFAULT_TOKEN_LIFETIME_SECONDS
+        to_encode["exp"] = int(time.time() + lifetime)
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme)) -> User:
+    @staticmethod
+    async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            email: str = payload.get("sub")
-            if email is None:
-                raise credentials_exception
+            email = decode_access_token(token)
         except JWTError:
             raise credentials_exception
         
-        user = self.db.query(User).filter(User.email == email).first()
+        user = get_user_by_email(db, email)
         if user is None:
             raise credentials_exception
         return user
 
     def create_user(self, email: str, password: str) -> User:
-        # Check if user already exists
-        existing_user = self.db.query(User).filter(User.email == email).first()
-        if existing_user:
+        hashed_password = self.get_password_hash(password)
+        user_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+
+        # Insert unless the email is taken, in one statement: no window for two
+        # concurrent signups to both pass an existence check
+        insert = _CONFLICT_INSERTS[self.db.get_bind().dialect.name]
+        stmt = (
+            insert(User)
+            .values(
+                id=user_id,
+                email=email,
+                hashed_password=hashed_password,
+                created_at=now,
+                updated_at=now
+            )
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(User)
+        )
+        db_user = self.db.scalars(stmt).one_or_none()
+        if db_user is None:
+            self.db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
-
-        # Create new user
-        hashed_password = self.get_password_hash(password)
-        user_id = str(uuid.uuid4())
-        db_user = User(
-            id=user_id,
-            email=email,
-            hashed_password=hashed_password,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        self.db.add(db_user)
         # Don't commit yet, need to add algorithm first in the same transaction
 
         # Create a default Algorithm for the new user
@@ -99,17 +180,17 @@ class AuthService:
             # self.db.refresh(default_algo) 
         except Exception as e:
             self.db.rollback() # Rollback if commit fails
-            print(f"!!! Error during user/algo creation commit: {e!r}")
+            logger.error("!!! Error during user/algo creation commit: %r", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
                 detail="Failed to create user and default algorithm."
             )
         
-        print(f"--- User {email} created with ID {user_id} and default algorithm ---")
+        logger.info("--- User %s created with ID %s and default algorithm ---", email, user_id)
         return db_user
 
     def authenticate_user(self, email: str, password: str) -> Optional[User]:
-        user = self.db.query(User).filter(User.email == email).first()
+        user = get_user_by_email(self.db, email)
         if not user:
             return None
         if not self.verify_password(password, user.hashed_password):
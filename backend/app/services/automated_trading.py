@@ -1,19 +1,121 @@
 from datetime import datetime, timedelta
 import asyncio
 import logging
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional
+import numpy as np
+from alpaca.data.live import StockDataStream
 from alpaca.trading.stream import TradingStream
-from alpaca.trading.enums import OrderSide, TimeInForce
-from alpaca.trading.requests import MarketOrderRequest
+from alpaca.trading.enums import OrderSide
 
-from .alpaca_service import AlpacaService
+from .alpaca_service import AlpacaService, run_stream
+from ._sma_aot import crossover_signal
+
+try:
+    # Built ahead of time by `python -m app.services._sma_aot`
+    from ._sma_kernel import compute_signal as _compute_signal
+except ImportError:
+    try:
+        from numba import njit
+    except ImportError:
+        # Without numba the kernel runs as plain Python
+        _compute_signal = crossover_signal
+    else:
+        _compute_signal = njit('i8(f8[::1], i8, i8)', cache=True)(crossover_signal)
+
+# Timeframes the market data stream pushes bars for, and the subscribe method for each
+STREAMED_TIMEFRAMES = {
+    '1Min': 'subscribe_bars',
+    '1D': 'subscribe_daily_bars',
+}
+# Polling interval for the other timeframes: one bar length
+POLL_SECONDS = {
+    '5Min': 5 * 60,
+    '15Min': 15 * 60,
+    '1H': 60 * 60,
+}
+
+class _PriceRing:
+    """The latest `size` closes in a preallocated float64 buffer. Each close is
+    written twice, `size` slots apart, so the window is always one contiguous
+    slice in time order and reading it never copies."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.buf = np.empty(2 * size, dtype=np.float64)
+        self.head = 0  # Slot the next close goes to
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def push(self, close: float):
+        i = self.head
+        self.buf[i] = self.buf[i + self.size] = close
+        self.head = (i + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def replace_last(self, close: float):
+        i = (self.head - 1) % self.size
+        self.buf[i] = self.buf[i + self.size] = close
+
+    def last(self) -> float:
+        return float(self.buf[(self.head - 1) % self.size])
+
+    def view(self) -> np.ndarray:
+        end = self.head + self.size
+        return self.buf[end - self.count:end]
+
+class _RollingCrossover:
+    """Short/long SMA crossover over the latest closes, updated in O(1) per bar"""
+
+    def __init__(self, short_window: int, long_window: int, closes: Iterable[float] = ()):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.closes = _PriceRing(max(short_window, long_window))
+        self.short_sum = 0.0
+        self.long_sum = 0.0
+        for close in closes:
+            self.push(close)
+
+    def push(self, close: float):
+        closes = self.closes
+        n = len(closes)
+        # Drop the prices leaving each window before the ring overwrites them
+        if n >= self.short_window or n >= self.long_window:
+            window = closes.view()
+            if n >= self.short_window:
+                self.short_sum -= window[n - self.short_window]
+            if n >= self.long_window:
+                self.long_sum -= window[n - self.long_window]
+        closes.push(close)
+        self.short_sum += close
+        self.long_sum += close
+
+    def signal(self) -> int:
+        n = len(self.closes)
+        if n < self.short_window or n < self.long_window:
+            return 0
+        short_last = self.short_sum / self.short_window
+        long_last = self.long_sum / self.long_window
+        if short_last > long_last:
+            return 1
+        if short_last < long_last:
+            return -1
+        return 0
 
 class AutomatedTradingService:
     def __init__(self, alpaca_service: AlpacaService):
         self.alpaca_service = alpaca_service
         self.trading_stream = None
+        self.data_stream: Optional[StockDataStream] = None
+        self.crossovers: Dict[str, _RollingCrossover] = {}
+        self.max_position_sizes: Dict[str, float] = {}
+        # Signal each symbol last traded on, so a repeated signal doesn't re-submit
+        self._last_signal: Dict[str, int] = {}
         self.current_positions: Dict[str, float] = {}
         self.is_running = False
+        self._loop_task: Optional[asyncio.Task] = None
         self.logger = logging.getLogger(__name__)
 
     async def initialize(self):
@@ -22,15 +124,17 @@ class AutomatedTradingService:
             # Get current positions
             positions = await self.alpaca_service.get_positions()
             self.current_positions = {
-                position.symbol: float(position.qty) 
-                for position in positions
+                symbol: position.quantity
+                for symbol, position in positions.items()
             }
             
-            # Initialize trading stream
+            # Initialize trading stream; raw_data hands over the decoded message dicts
+            # instead of validating a TradeUpdate model per message
             self.trading_stream = TradingStream(
                 api_key=self.alpaca_service.api_key,
                 secret_key=self.alpaca_service.secret_key,
-                paper=self.alpaca_service.paper
+                paper=self.alpaca_service.paper,
+                raw_data=True
             )
             
             # Subscribe to trade updates
@@ -42,143 +146,206 @@ class AutomatedTradingService:
             self.logger.error(f"Failed to initialize automated trading: {str(e)}")
             return False
 
-    async def handle_trade_update(self, trade_update):
-        """Handle trade updates and update position tracking"""
+    async def handle_trade_update(self, message: Dict):
+        """Handle raw trade_updates stream messages and update position tracking"""
         try:
-            symbol = trade_update.order.symbol
-            if trade_update.event == 'fill':
-                if trade_update.order.side == OrderSide.BUY:
-                    self.current_positions[symbol] = self.current_positions.get(symbol, 0) + float(trade_update.order.filled_qty)
-                else:
-                    self.current_positions[symbol] = self.current_positions.get(symbol, 0) - float(trade_update.order.filled_qty)
-                
-                # Remove position if quantity is zero
-                if self.current_positions[symbol] == 0:
-                    del self.current_positions[symbol]
-                
-                self.logger.info(f"Position updated for {symbol}: {self.current_positions.get(symbol, 0)}")
+            update = message['data']
+            if update['event'] != 'fill':
+                return
+            order = update['order']
+            symbol = order['symbol']
+            filled_qty = float(order['filled_qty'])
+            positions = self.current_positions
+            qty = positions.get(symbol, 0.0)
+            qty = qty + filled_qty if order['side'] == 'buy' else qty - filled_qty
+            
+            # Remove position if quantity is zero
+            if qty == 0.0:
+                positions.pop(symbol, None)
+            else:
+                positions[symbol] = qty
+            
+            self.logger.info("Position updated for %s: %s", symbol, qty)
         except Exception as e:
-            self.logger.error(f"Error handling trade update: {str(e)}")
+            self.logger.error("Error handling trade update: %s", e)
 
     async def run_trading_loop(self, symbol: str, timeframe: str, lookback_days: int, 
                              short_window: int, long_window: int, max_position_size: float = 0.1):
-        """Run continuous trading loop with the specified parameters"""
-        if not self.is_running:
-            self.is_running = True
-            self.logger.info("Starting trading loop...")
-            
+        """Run continuous trading with the specified parameters. Streamed timeframes
+        react to each new bar; the others are polled once per bar."""
+        if self.is_running:
+            return
+        self.is_running = True
+        self._loop_task = asyncio.current_task()
+        self.logger.info("Starting trading loop...")
+        try:
+            if timeframe in STREAMED_TIMEFRAMES:
+                await self._run_on_bars(symbol, timeframe, lookback_days, short_window, long_window, max_position_size)
+            else:
+                await self._run_polling(symbol, timeframe, lookback_days, short_window, long_window, max_position_size)
+        except asyncio.CancelledError:
+            self.logger.info("Trading loop cancelled")
+            raise
+        except Exception as e:
+            self.logger.error(f"Trading loop stopped due to error: {str(e)}")
+        finally:
+            self.is_running = False
+            self._loop_task = None
+
+    async def _run_on_bars(self, symbol: str, timeframe: str, lookback_days: int,
+                           short_window: int, long_window: int, max_position_size: float):
+        """Seed the windows from history once, then update them from streamed bars"""
+        closes = await self.alpaca_service.get_close_prices(
+            symbol=symbol,
+            timeframe=timeframe,
+            lookback_days=lookback_days
+        )
+        self.crossovers[symbol] = _RollingCrossover(short_window, long_window, closes.tolist())
+        self.max_position_sizes[symbol] = max_position_size
+
+        self.data_stream = StockDataStream(
+            api_key=self.alpaca_service.api_key,
+            secret_key=self.alpaca_service.secret_key
+        )
+        getattr(self.data_stream, STREAMED_TIMEFRAMES[timeframe])(self._on_bar, symbol)
+        await run_stream(self.data_stream)
+
+    async def _on_bar(self, bar):
+        """Fold a streamed bar into its symbol's windows and act on the signal"""
+        try:
+            crossover = self.crossovers.get(bar.symbol)
+            if crossover is None:
+                return
+            crossover.push(float(bar.close))
+            await self._act_on_signal(bar.symbol, crossover.signal(), self.max_position_sizes[bar.symbol])
+        except Exception as e:
+            self.logger.error("Error handling bar: %s", e)
+
+    async def _run_polling(self, symbol: str, timeframe: str, lookback_days: int,
+                           short_window: int, long_window: int, max_position_size: float):
+        """Fetch the lookback once, then each poll only fetches bars from the newest one
+        held (refreshing it, since it may have been partial) and slides the window"""
+        poll_seconds = POLL_SECONDS.get(timeframe, 60)
+        closes = _PriceRing(max(short_window, long_window))
+        last_ts: Optional[datetime] = None
+        while self.is_running:
             try:
-                while self.is_running:
-                    try:
-                        # Get historical bars
-                        prices = await self.alpaca_service.get_historical_bars(
-                            symbol=symbol,
-                            timeframe=timeframe,
-                            lookback_days=lookback_days
-                        )
-                        
-                        if not prices:
-                            self.logger.warning("No price data received")
-                            await asyncio.sleep(60)
-                            continue
-                        
-                        # Calculate moving averages
-                        short_ma, long_ma = self.calculate_moving_averages(prices, short_window, long_window)
-                        
-                        # Generate signal
-                        signal = self.generate_signal(short_ma, long_ma)
-                        
-                        # Get current position
-                        current_position = self.current_positions.get(symbol, 0)
-                        
-                        # Execute trade based on signal and position
-                        if signal == 1 and current_position <= 0:
-                            # Buy signal and no position or short position
-                            await self.execute_trade(symbol, OrderSide.BUY, max_position_size)
-                        elif signal == -1 and current_position >= 0:
-                            # Sell signal and no position or long position
-                            await self.execute_trade(symbol, OrderSide.SELL, max_position_size)
-                        
-                        # Wait for next iteration
-                        await asyncio.sleep(60)  # Adjust based on timeframe
-                        
-                    except Exception as e:
-                        self.logger.error(f"Error in trading loop: {str(e)}")
-                        await asyncio.sleep(60)
-                        
+                changed = False
+                if last_ts is None:
+                    bars = await self.alpaca_service.get_historical_bars(
+                        symbol=symbol,
+                        timeframe=timeframe,
+                        lookback_days=lookback_days
+                    )
+                else:
+                    bars = await self.alpaca_service.get_bars_since(symbol, timeframe, last_ts)
+                    if bars and bars[0]['timestamp'] == last_ts:
+                        # Refreshed copy of the newest bar held
+                        refreshed, bars = bars[0], bars[1:]
+                        if refreshed['close'] != closes.last():
+                            closes.replace_last(refreshed['close'])
+                            changed = True
+                for bar in bars:
+                    closes.push(bar['close'])
+                if bars:
+                    last_ts = bars[-1]['timestamp']
+                    changed = True
+                
+                if not closes:
+                    self.logger.warning("No price data received")
+                elif changed:
+                    # Moving averages and signal in one pass, without building the MA series;
+                    # an unchanged window means an unchanged signal
+                    signal = _compute_signal(closes.view(), short_window, long_window)
+                    await self._act_on_signal(symbol, signal, max_position_size)
             except Exception as e:
-                self.logger.error(f"Trading loop stopped due to error: {str(e)}")
-            finally:
-                self.is_running = False
+                self.logger.error("Error in trading loop: %s", e)
+            # Wait for the next bar
+            await asyncio.sleep(poll_seconds)
 
-    async def execute_trade(self, symbol: str, side: OrderSide, max_position_size: float):
-        """Execute a trade with position sizing and risk management"""
+    async def _act_on_signal(self, symbol: str, signal: int, max_position_size: float):
+        """Trade when the signal disagrees with the current position and differs from
+        the signal last traded on (its order may not have filled yet)"""
+        if signal == 0 or signal == self._last_signal.get(symbol):
+            return
+        current_position = self.current_positions.get(symbol, 0)
+        if signal == 1 and current_position <= 0:
+            # Buy signal and no position or short position
+            side = OrderSide.BUY
+        elif signal == -1 and current_position >= 0:
+            # Sell signal and no position or long position
+            side = OrderSide.SELL
+        else:
+            return
+        if await self.execute_trade(symbol, side, max_position_size):
+            self._last_signal[symbol] = signal
+
+    async def execute_trade(self, symbol: str, side: OrderSide, max_position_size: float) -> bool:
+        """Execute a trade with position sizing and risk management. Returns whether
+        the order was placed."""
         try:
-            # Get account equity
-            account = await self.alpaca_service.get_account()
-            equity = float(account.equity)
+            # Get account equity (shared with other callers for a few seconds)
+            account_info = await self.alpaca_service.get_account_info()
+            equity = float(account_info['equity'])
             
             # Calculate position size
             position_size = equity * max_position_size
             
             # Get current price
-            latest_trade = await self.alpaca_service.get_latest_trade(symbol)
-            current_price = float(latest_trade.price)
+            current_price = await self.alpaca_service.get_latest_price(symbol)
+            if not current_price:
+                raise ValueError(f"No latest price for {symbol}")
             
             # Calculate quantity
             quantity = position_size / current_price
             
-            # Place order
-            order_request = MarketOrderRequest(
-                symbol=symbol,
-                qty=quantity,
-                side=side,
-                time_in_force=TimeInForce.DAY
-            )
-            
-            await self.alpaca_service.place_order(order_request)
-            self.logger.info(f"Executed {side} order for {symbol}: {quantity} shares")
+            # place_order builds the MarketOrderRequest without re-validating it
+            await self.alpaca_service.place_order(symbol=symbol, quantity=quantity, side=side, time_in_force='day')
+            self.logger.info("Executed %s order for %s: %s shares", side, symbol, quantity)
+            return True
             
         except Exception as e:
-            self.logger.error(f"Error executing trade: {str(e)}")
+            self.logger.error("Error executing trade: %s", e)
+            return False
 
     def stop_trading(self):
-        """Stop the trading loop"""
+        """Stop the trading loop, cancelling it mid-sleep rather than letting it run
+        another iteration"""
         self.is_running = False
-        if self.trading_stream:
-            self.trading_stream.stop()
+        if self._loop_task and self._loop_task is not asyncio.current_task():
+            self._loop_task.cancel()
+        for stream in (self.trading_stream, self.data_stream):
+            if stream:
+                self._close_stream(stream)
         self.logger.info("Trading loop stopped")
 
     @staticmethod
-    def calculate_moving_averages(prices: list, short_window: int, long_window: int):
-        """Calculate moving averages"""
-        short_ma = []
-        long_ma = []
-        
-        for i in range(len(prices)):
-            if i >= short_window - 1:
-                short_ma.append(sum(prices[i-short_window+1:i+1]) / short_window)
-            else:
-                short_ma.append(None)
-                
-            if i >= long_window - 1:
-                long_ma.append(sum(prices[i-long_window+1:i+1]) / long_window)
-            else:
-                long_ma.append(None)
-                
-        return short_ma, long_ma
+    def _close_stream(stream):
+        """stop() blocks on the stream's own loop, so close it from ours when we have one"""
+        try:
+            asyncio.get_running_loop().create_task(stream.stop_ws())
+        except RuntimeError:
+            stream.stop()
 
     @staticmethod
-    def generate_signal(short_ma: list, long_ma: list) -> int:
+    def calculate_moving_averages(prices, short_window: int, long_window: int):
+        """Calculate moving averages as float64 arrays (NaN until each window fills)"""
+        arr = np.asarray(prices, dtype=np.float64)
+        # Prefix sums: each window mean is one subtraction, for both windows
+        cs = np.concatenate(([0.0], np.cumsum(arr)))
+        return _rolling_mean(cs, short_window), _rolling_mean(cs, long_window)
+
+    @staticmethod
+    def generate_signal(short_ma, long_ma) -> int:
         """Generate trading signal based on moving averages"""
-        if not short_ma or not long_ma:
+        if len(short_ma) == 0 or len(long_ma) == 0:
             return 0
             
-        # Get the last valid values
-        short_last = next((x for x in reversed(short_ma) if x is not None), None)
-        long_last = next((x for x in reversed(long_ma) if x is not None), None)
+        # NaN padding is only at the front, so the last values are valid whenever any are
+        short_last = short_ma[-1]
+        long_last = long_ma[-1]
         
-        if short_last is None or long_last is None:
+        if np.isnan(short_last) or np.isnan(long_last):
             return 0
             
         if short_last > long_last:
@@ -186,4 +353,12 @@ class AutomatedTradingService:
         elif short_last < long_last:
             return -1  # Sell signal
         else:
-            return 0  # Hold signal 
\ No newline at end of file
+            return 0  # Hold signal
+
+def _rolling_mean(cs: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over window from prefix sums cs (len(cs) == len(prices) + 1)"""
+    n = len(cs) - 1
+    out = np.full(n, np.nan)
+    if window <= n:
+        out[window - 1:] = (cs[window:] - cs[:-window]) / window
+    return out
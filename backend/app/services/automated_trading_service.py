@@ -1,21 +1,61 @@
 from datetime import datetime, timedelta
 import asyncio
 import logging
-from typing import Optional, Dict, Any, List
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple
+import numpy as np
 
 # Inject Database session
+from sqlalchemy import select
 from sqlalchemy.orm import Session, sessionmaker
 
-from .alpaca_service import AlpacaService
-from .algorithm_service import AlgorithmService
+from .alpaca_service import AlpacaService, BAR_INTERVALS, run_stream
+from .algorithm_service import AlgorithmService, INSTANCE_BAR_LIMIT, instance_data_window
 # Import models directly for querying and type hints
 from ..models import Algorithm, AlgorithmType, Signal, SignalType, Position, PositionStatus, Trade, TradeType, TradeStatus
 from ..models.db_models import Trade as DBTrade, Signal as DBSignal # Import DB models for saving
 from alpaca.trading.enums import OrderSide
+from alpaca.trading.stream import TradingStream
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Algorithms processed at once per cycle; the Alpaca rate limiter paces the calls further
+MAX_CONCURRENT_ALGORITHMS = 10
+
+# Positions are kept current from the trade-updates stream; they are re-read from
+# Alpaca this often anyway, and every cycle while the stream isn't running
+POSITIONS_RESYNC_SECONDS = 15 * 60
+
+# How long stop_trading lets an in-flight cycle finish (and record its orders) before cancelling it
+STOP_GRACE_SECONDS = 30
+
+# The active algorithms are re-read when AlgorithmService.version changes, and at
+# least this often to pick up edits made outside this process
+ACTIVE_ALGORITHMS_MAX_AGE = 5 * 60
+
+@dataclass(slots=True)
+class AlgoSpec:
+    """The columns of an active Algorithm row that a trading cycle reads."""
+    id: int
+    user_id: str
+    symbol: str
+    type: AlgorithmType
+    parameters: Dict[str, Any]
+
+@dataclass(slots=True)
+class TrackedPosition:
+    """A symbol's open position as the trading loop tracks it."""
+    qty: float
+    avg_entry: float
+
+# Only the columns AlgoSpec needs, so no ORM objects are hydrated per cycle
+ACTIVE_ALGORITHMS_STMT = select(
+    Algorithm.id, Algorithm.user_id, Algorithm.symbol, Algorithm.type, Algorithm.parameters
+).where(Algorithm.is_active.is_(True))
+
 class AutomatedTradingService:
     # Accept SessionLocal factory instead of Session
     def __init__(self, algorithm_service: AlgorithmService, alpaca_service: AlpacaService, session_local: sessionmaker):
@@ -25,10 +65,27 @@ class AutomatedTradingService:
         self.is_active = False
         self.config = None
         self._trading_task: Optional[asyncio.Task] = None # To hold the background task
-        # Track positions per symbol
-        self._positions: Dict[str, Any] = {} 
+        # Set by stop_trading; the loop waits on it between cycles
+        self._stop_event = asyncio.Event()
+        # Track open positions per symbol
+        self._positions: Dict[str, TrackedPosition] = {}
+        # Symbols read from Alpaca since the last full resync, and when that was (monotonic)
+        self._synced_symbols: set = set()
+        self._positions_synced_at: Optional[float] = None
+        self._trade_stream: Optional[TradingStream] = None
+        self._stream_task: Optional[asyncio.Task] = None
+        # Buying power read once at the start of each cycle (None if that read failed)
+        self._buying_power: Optional[float] = None
+        # Latest prices for the active symbols, read in one quote request per cycle
+        self._latest_prices: Dict[str, float] = {}
+        # Active algorithms as of AlgorithmService.version _algo_cache_version, read at _algo_cache_at
+        self._algo_cache: Optional[List[AlgoSpec]] = None
+        self._algo_cache_version = -1
+        self._algo_cache_at = 0.0
         # Track last signal per algorithm to avoid duplicate actions
         self._last_signal: Dict[int, SignalType] = {}
+        # Held while an algorithm checks and trades a symbol, so algorithms sharing it don't double up
+        self._symbol_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
 
     async def start_trading(self, config: Dict):
         """Start automated trading with the given configuration."""
@@ -39,9 +96,11 @@ class AutomatedTradingService:
         try:
             self.config = config
             self.is_active = True
+            self._stop_event.clear()
             logger.info("Automated trading starting with config: %s", config)
             # Start the main processing loop in the background
             # TODO: Add interval customization from config?
+            self._start_trade_stream()
             self._trading_task = asyncio.create_task(self._run_active_strategies_loop())
             return True
         except Exception as e:
@@ -54,18 +113,29 @@ class AutomatedTradingService:
     async def stop_trading(self):
         """Stop automated trading."""
         self.is_active = False
+        self._stop_event.set()
         if self._trading_task and not self._trading_task.done():
-            self._trading_task.cancel() # Request cancellation
+            # The loop exits on its own once the current cycle ends; algorithms not yet
+            # started skip themselves, and orders already placed get recorded
+            done, _ = await asyncio.wait({self._trading_task}, timeout=STOP_GRACE_SECONDS)
+            if not done:
+                logger.warning(f"Trading cycle still running after {STOP_GRACE_SECONDS}s; cancelling it.")
+                self._trading_task.cancel() # Request cancellation
             try:
-                await self._trading_task # Wait for the task to finish cancelling
+                await self._trading_task # Wait for the task to finish
             except asyncio.CancelledError:
                 logger.info("Trading task successfully cancelled.")
             except Exception as e:
-                logger.error(f"Error during trading task cancellation: {e!r}")
+                logger.error(f"Error during trading task shutdown: {e!r}")
+        await self._stop_trade_stream()
         self.config = None
         self._trading_task = None
         self._positions = {} # Clear positions on stop
+        self._synced_symbols = set()
+        self._positions_synced_at = None
+        self._algo_cache = None
         self._last_signal = {} # Clear last signals
+        self._symbol_locks.clear()
         logger.info("Automated trading stopped.")
 
     def get_status(self) -> Dict:
@@ -92,16 +162,21 @@ class AutomatedTradingService:
     async def _run_active_strategies_loop(self, interval_seconds: int = 60):
         """Main loop to periodically fetch and process active strategies."""
         logger.info(f"Starting active strategies processing loop (interval: {interval_seconds}s)...")
-        while self.is_active:
-            db: Optional[Session] = None # Define db variable
+        # Cycles start on a fixed monotonic schedule, so processing time doesn't add drift
+        loop = asyncio.get_running_loop()
+        next_deadline = loop.time() + interval_seconds
+        while not self._stop_event.is_set():
             try:
                 logger.info("Starting new trading cycle...")
-                # Create a new session for this loop iteration
-                db = self.SessionLocal()
-                
+                # The account read doesn't depend on the algorithms, so it overlaps their load
+                buying_power_task = asyncio.create_task(self._update_buying_power())
                 # --- Update current positions for all relevant symbols first --- #
-                # Get symbols from active algorithms
-                active_algorithms = db.query(Algorithm).filter(Algorithm.is_active == True).all()
+                # Get symbols from active algorithms (read on a worker thread)
+                try:
+                    active_algorithms = await self._get_active_algorithms()
+                except BaseException:
+                    buying_power_task.cancel()
+                    raise
                 active_symbols = {algo.symbol for algo in active_algorithms} 
                 logger.info(f"Active symbols: {active_symbols}")
                 
@@ -109,55 +184,229 @@ class AutomatedTradingService:
                 # Note: Alpaca API might not have a bulk position fetch, loop might be needed
                 # Or fetch all positions and filter locally
                 # For now, placeholder - assume _update_positions fetches needed data
-                await self._update_positions(list(active_symbols))
+                # Positions, the account and quotes are read once per cycle, side by side
+                await asyncio.gather(
+                    self._update_positions(list(active_symbols)),
+                    buying_power_task,
+                    self._update_latest_prices(list(active_symbols))
+                )
 
                 logger.info(f"Processing {len(active_algorithms)} active algorithms...")
                 if not active_algorithms:
                     logger.info("No active algorithms found. Sleeping.")
                 else:
-                    # Process each active algorithm
-                    for algo in active_algorithms:
-                        logger.info(f"--- Processing algorithm ID {algo.id} ({algo.type.name} for {algo.symbol}) ---")
-                        # Pass the specific algorithm object and DB session
-                        await self._process_single_algorithm(algo, db) 
-                        await asyncio.sleep(0.5) # Small delay between algos within a cycle
+                    # Fetch each distinct price window once for all algorithms that share it
+                    closes = await self._prefetch_closes(active_algorithms)
+
+                    # Process the algorithms concurrently; one failure doesn't stop the others
+                    semaphore = asyncio.Semaphore(MAX_CONCURRENT_ALGORITHMS)
+
+                    async def process(algo: AlgoSpec):
+                        async with semaphore:
+                            logger.info(f"--- Processing algorithm ID {algo.id} ({algo.type.name} for {algo.symbol}) ---")
+                            window = instance_data_window(algo.parameters)
+                            return await self._process_single_algorithm(algo, closes.get((algo.symbol, *window)))
+
+                    # Each trade is saved as soon as its order is placed (see _record_trade)
+                    results = await asyncio.gather(*(process(algo) for algo in active_algorithms), return_exceptions=True)
+                    for algo, result in zip(active_algorithms, results):
+                        if isinstance(result, Exception):
+                            logger.error(f"Algorithm ID {algo.id} failed: {result!r}")
                 
-                logger.info(f"Finished processing cycle. Sleeping for {interval_seconds} seconds.")
+                logger.info("Finished processing cycle. Sleeping until the next interval.")
                 
-            except asyncio.CancelledError:
-                logger.info("Trading loop cancellation requested.")
-                self.is_active = False # Ensure loop terminates
-                break # Exit loop immediately
             except Exception as e:
+                # Cancellation isn't an Exception, so stop_trading's cancel ends the loop here
                 logger.exception(f"Error in active strategies loop: {e!r}. Sleeping and retrying.")
-                # Log the full traceback
-            finally:
-                if db: # Ensure session is closed
-                    db.close()
-                # Sleep only if the loop wasn't cancelled
-                if self.is_active:
-                     try:
-                          await asyncio.sleep(interval_seconds)
-                     except asyncio.CancelledError:
-                          logger.info("Sleep interrupted by cancellation.")
-                          self.is_active = False # Ensure loop terminates
-        
+
+            now = loop.time()
+            if now > next_deadline:
+                # Cycle ran past its slot; restart the schedule from now rather than bursting
+                next_deadline = now + interval_seconds
+            try:
+                # Wakes early, and the loop exits, as soon as trading is stopped
+                await asyncio.wait_for(self._stop_event.wait(), timeout=next_deadline - now)
+            except TimeoutError:
+                next_deadline += interval_seconds
+
         logger.info("Active strategies processing loop finished.")
 
+    def _save_trade(self, trade: DBTrade):
+        """Blocking insert of one trade; run through _record_trade."""
+        with self.SessionLocal() as db:
+            db.add(trade)
+            db.commit()
+            logger.info(f"{trade.side.name} {trade.symbol}: Saved Trade ID {trade.id} to database.")
+
+    async def _record_trade(self, trade: DBTrade):
+        """Save the trade of an order that was just placed. The insert is shielded, so
+        cancelling the cycle while it runs doesn't stop it; a failed insert only loses
+        this trade's row, and is logged with its order id."""
+        try:
+            await asyncio.shield(asyncio.to_thread(self._save_trade, trade))
+        except Exception as e:
+            logger.exception(f"{trade.side.name} {trade.symbol}: Error saving trade for order {trade.order_id}: {e!r}")
+
+    async def _get_active_algorithms(self) -> List[AlgoSpec]:
+        """Active algorithms, re-read only after an algorithm write or ACTIVE_ALGORITHMS_MAX_AGE."""
+        version = AlgorithmService.version  # Taken before the read, so a write during it triggers another
+        now = time.monotonic()
+        if (self._algo_cache is not None and self._algo_cache_version == version
+                and now - self._algo_cache_at < ACTIVE_ALGORITHMS_MAX_AGE):
+            return self._algo_cache
+        self._algo_cache = await asyncio.to_thread(self._load_active_algorithms)
+        self._algo_cache_version = version
+        self._algo_cache_at = now
+        return self._algo_cache
+
+    def _load_active_algorithms(self) -> List[AlgoSpec]:
+        """Blocking read of the active algorithms; the session is only held for the read."""
+        with self.SessionLocal() as db:
+            return [AlgoSpec(*row) for row in db.execute(ACTIVE_ALGORITHMS_STMT)]
+
+    async def _prefetch_closes(self, algorithms: List[AlgoSpec]) -> Dict[Tuple[str, str, int], np.ndarray]:
+        """Closes keyed by (symbol, timeframe, lookback_days), fetched with one bars
+        request per (timeframe, lookback_days) covering all of its symbols. Windows
+        that fail here, and symbols whose bars stop short of the window's newest bar,
+        are left out and fetched by the algorithm itself."""
+        symbols_by_window: Dict[Tuple[str, int], set] = defaultdict(set)
+        for algo in algorithms:
+            symbols_by_window[instance_data_window(algo.parameters)].add(algo.symbol)
+
+        async def fetch(window: Tuple[str, int], symbols: set):
+            timeframe, lookback_days = window
+            return await self.alpaca_service.get_historical_bars(
+                sorted(symbols),
+                timeframe=timeframe,
+                lookback_days=lookback_days,
+                limit=INSTANCE_BAR_LIMIT
+            )
+
+        windows = list(symbols_by_window.items())
+        results = await asyncio.gather(*(fetch(window, symbols) for window, symbols in windows), return_exceptions=True)
+        closes: Dict[Tuple[str, str, int], np.ndarray] = {}
+        for (window, _), result in zip(windows, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error prefetching prices for {window}: {result!r}")
+                continue
+            # Trading on a truncated series would act on stale prices, so every symbol's
+            # last bar must be within one bar of the newest one in the response
+            latest = max((bars[-1]['timestamp'] for bars in result.values() if bars), default=None)
+            if latest is None:
+                continue
+            cutoff = latest - BAR_INTERVALS[window[0]]
+            for symbol, bars in result.items():
+                if not bars or bars[-1]['timestamp'] < cutoff:
+                    logger.warning(f"Prefetched {symbol} bars for {window} end before {cutoff}, fetching them per algorithm")
+                    continue
+                closes[(symbol, *window)] = np.fromiter((bar['close'] for bar in bars), dtype=np.float32, count=len(bars))
+        return closes
+
+    def _start_trade_stream(self):
+        """Keep _positions current from Alpaca's trade-updates stream."""
+        try:
+            self._trade_stream = TradingStream(
+                api_key=self.alpaca_service.api_key,
+                secret_key=self.alpaca_service.secret_key,
+                paper=self.alpaca_service.paper,
+                raw_data=True
+            )
+            self._trade_stream.subscribe_trade_updates(self._on_trade_update)
+            self._stream_task = asyncio.create_task(run_stream(self._trade_stream))
+        except Exception as e:
+            logger.error(f"Error starting trade updates stream, positions will be polled: {e!r}")
+            self._trade_stream = None
+            self._stream_task = None
+
+    async def _stop_trade_stream(self):
+        if self._trade_stream is not None:
+            try:
+                await self._trade_stream.stop_ws()
+            except Exception as e:
+                logger.error(f"Error stopping trade updates stream: {e!r}")
+        if self._stream_task is not None and not self._stream_task.done():
+            self._stream_task.cancel()
+        self._trade_stream = None
+        self._stream_task = None
+
+    async def _on_trade_update(self, message: Dict):
+        """Apply a fill from the trade-updates stream to _positions."""
+        try:
+            update = message['data']
+            if update['event'] not in ('fill', 'partial_fill'):
+                return
+            symbol = update['order']['symbol']
+            new_qty = float(update['position_qty'])
+            if new_qty == 0.0:
+                self._positions.pop(symbol, None)
+                return
+            position = self._positions.get(symbol)
+            if position is None:
+                position = self._positions[symbol] = TrackedPosition(0.0, 0.0)
+            fill_price = float(update['price'])
+            qty = position.qty
+            if qty * new_qty < 0:
+                position.avg_entry = fill_price  # Flipped sides; the new position was all opened at this fill
+            elif abs(new_qty) > abs(qty):
+                # Position grew: blend the fill into the average entry price
+                position.avg_entry = (abs(qty) * position.avg_entry + (abs(new_qty) - abs(qty)) * fill_price) / abs(new_qty)
+            position.qty = new_qty
+        except Exception as e:
+            logger.error(f"Error handling trade update: {e!r}")
+
     async def _update_positions(self, symbols: List[str]):
-        """Fetches and updates the current positions for the given symbols."""
-        logger.info(f"Updating positions for symbols: {symbols}")
-        # Placeholder: Fetch all positions and update self._positions
+        """Reads positions from Alpaca for symbols not yet tracked. All of them are
+        re-read every POSITIONS_RESYNC_SECONDS, and every cycle without the stream."""
+        now = time.monotonic()
+        stream_down = self._stream_task is None or self._stream_task.done()
+        full = stream_down or self._positions_synced_at is None or now - self._positions_synced_at >= POSITIONS_RESYNC_SECONDS
+        to_fetch = symbols if full else [symbol for symbol in symbols if symbol not in self._synced_symbols]
+        if not to_fetch:
+            return
+        logger.info(f"Updating positions for symbols: {to_fetch}")
         try:
-             all_positions_raw = await self.alpaca_service.trading_client.get_all_positions() # Using client directly for now
-             self._positions = {pos.symbol: pos.__dict__ for pos in all_positions_raw}
-             logger.info(f"Updated positions: {self._positions}")
+            positions = await self.alpaca_service.get_positions(to_fetch)
         except Exception as e:
             logger.error(f"Error fetching positions from Alpaca: {e!r}")
-            # Decide how to handle - clear existing? Keep stale? For now, log error.
+            return
+        if full:
+            # Symbols whose read failed keep their tracked position until a read succeeds
+            self._positions = {symbol: position for symbol, position in self._positions.items() if symbol not in positions}
+            self._synced_symbols = set()
+            self._positions_synced_at = now
+        for symbol, position in positions.items():
+            if position is None:
+                self._positions.pop(symbol, None)
+            else:
+                self._positions[symbol] = TrackedPosition(position.quantity, position.entry_price)
+        # Failed symbols stay unsynced, so they are read again next cycle
+        self._synced_symbols.update(positions)
+        logger.info(f"Updated positions: {self._positions}")
+
+    async def _update_buying_power(self):
+        """Reads the account's buying power for this cycle's buys."""
+        try:
+            account_info = await self.alpaca_service.get_account_info()
+            self._buying_power = float(account_info.get('buying_power', 0.0))
+        except Exception as e:
+            self._buying_power = None
+            logger.error(f"Error fetching account from Alpaca: {e!r}")
 
-    async def _process_single_algorithm(self, algorithm: Algorithm, db: Session):
-        """Process a single trading cycle for the given algorithm instance."""
+    async def _update_latest_prices(self, symbols: List[str]):
+        """Reads latest prices for all active symbols in one quote request."""
+        if not symbols:
+            self._latest_prices = {}
+            return
+        try:
+            self._latest_prices = await self.alpaca_service.get_latest_prices(symbols)
+        except Exception as e:
+            self._latest_prices = {}
+            logger.error(f"Error fetching latest prices from Alpaca: {e!r}")
+
+    async def _process_single_algorithm(self, algorithm: AlgoSpec, close_prices: Optional[np.ndarray] = None) -> Optional[DBTrade]:
+        """Process a single trading cycle for the given algorithm instance, using
+        prefetched close_prices when given. Returns the trade if an order was placed;
+        it is recorded in the database before this returns."""
         if not self.is_active: # Re-check within the loop
             return
 
@@ -167,50 +416,69 @@ class AutomatedTradingService:
             logger.info(f"Running algorithm instance ID {algo_id} for {symbol}")
             
             # Generate and save signal using AlgorithmService
-            signal = await self.algorithm_service.run_algorithm_instance(algorithm, db)
+            signal = await self.algorithm_service.run_algorithm_instance(algorithm, self.SessionLocal, close_prices)
             
             if not signal:
                 logger.warning(f"No signal generated or saved for {symbol} by algo {algo_id}")
                 return
 
-            logger.info(f"Algo {algo_id}: Generated signal = {signal.signal_type.name}")
-            
-            # Get current position state for this symbol from our tracked dict
-            current_position = self._positions.get(symbol)
-            has_position = current_position is not None
-            last_signal_for_algo = self._last_signal.get(algo_id)
+            # model_construct skips use_enum_values, so signal.type is the Pydantic enum member;
+            # map it to the db enum by name
+            signal_type = SignalType[signal.type.name]
+            logger.info(f"Algo {algo_id}: Generated signal = {signal_type.name}")
             
             # Avoid acting on the same signal repeatedly
-            if signal.signal_type == last_signal_for_algo:
-                logger.info(f"Algo {algo_id}: Signal {signal.signal_type.name} is same as last signal. No action.")
+            if signal_type == self._last_signal.get(algo_id):
+                logger.info(f"Algo {algo_id}: Signal {signal_type.name} is same as last signal. No action.")
                 return
                 
             # Update last signal
-            self._last_signal[algo_id] = signal.signal_type
+            self._last_signal[algo_id] = signal_type
 
             # --- Trade Execution Logic --- #
-            # Uncomment the execution calls
-            if signal.signal_type == SignalType.BUY and not has_position:
-                logger.info(f"ACTION (Algo {algo_id}): Executing BUY for {symbol}.")
-                await self._execute_buy(symbol, algorithm, db)
-            elif signal.signal_type == SignalType.SELL and has_position:
-                logger.info(f"ACTION (Algo {algo_id}): Executing SELL (close position) for {symbol}.")
-                await self._execute_sell(symbol, algorithm, db)
-            else:
-                logger.info(f"Algo {algo_id}: Signal {signal.signal_type.name} does not warrant action for {symbol} (Position: {has_position})")
+            # The position check and the order are one step per symbol. A placed order
+            # is reflected in _positions right away (the stream's fill then corrects
+            # it), so the next algorithm on the symbol sees it.
+            async with self._symbol_locks[symbol]:
+                has_position = symbol in self._positions
+                if signal_type is SignalType.BUY and not has_position:
+                    logger.info(f"ACTION (Algo {algo_id}): Executing BUY for {symbol}.")
+                    latest_price = self._latest_prices.get(symbol)
+                    trade = None
+                    try:
+                        trade = await self._execute_buy(symbol, algorithm, latest_price)
+                    finally:
+                        if trade is not None:
+                            self._positions.setdefault(symbol, TrackedPosition(trade.quantity, trade.price or latest_price or 0.0))
+                            await self._record_trade(trade)
+                    return trade
+                elif signal_type is SignalType.SELL and has_position:
+                    logger.info(f"ACTION (Algo {algo_id}): Executing SELL (close position) for {symbol}.")
+                    trade = None
+                    try:
+                        trade = await self._execute_sell(symbol, algorithm)
+                    finally:
+                        if trade is not None:
+                            self._positions.pop(symbol, None)
+                            await self._record_trade(trade)
+                    return trade
+                else:
+                    logger.info(f"Algo {algo_id}: Signal {signal_type.name} does not warrant action for {symbol} (Position: {has_position})")
 
         except Exception as e:
             logger.exception(f"Error processing algorithm ID {algorithm.id} ({algorithm.symbol}): {e!r}")
             # Log full traceback
 
-    async def _execute_buy(self, symbol: str, algorithm: Algorithm, db: Session):
-        """Executes a buy order based on config and algo, and saves the trade."""
+    async def _execute_buy(self, symbol: str, algorithm: AlgoSpec, latest_price: Optional[float] = None) -> Optional[DBTrade]:
+        """Executes a buy order based on config and algo, and returns the trade to save.
+        latest_price is the cycle's quote for symbol; it is fetched when missing."""
         logger.info(f"Attempting BUY execution for {symbol} (Algo {algorithm.id})")
-        trade_saved = False
         try:
-            # 1. Get Buying Power
-            account_info = await self.alpaca_service.get_account_info()
-            buying_power = float(account_info.get('buying_power', 0.0))
+            # 1. Get Buying Power (read at the start of the cycle)
+            buying_power = self._buying_power
+            if buying_power is None:
+                account_info = await self.alpaca_service.get_account_info()
+                buying_power = float(account_info.get('buying_power', 0.0))
             logger.info(f"BUY {symbol}: Available buying power: ${buying_power:.2f}")
 
             if buying_power <= 1: # Add a small buffer
@@ -227,7 +495,8 @@ class AutomatedTradingService:
                  return
             
             # 3. Get Latest Price
-            latest_price = await self.alpaca_service.get_latest_price(symbol)
+            if not latest_price:
+                latest_price = await self.alpaca_service.get_latest_price(symbol)
             if not latest_price or latest_price <= 0:
                 logger.warning(f"BUY {symbol}: Could not fetch valid latest price ({latest_price}). Skipping order.")
                 return
@@ -245,7 +514,8 @@ class AutomatedTradingService:
             order_result_trade: Optional[Trade] = await self.alpaca_service.place_order(
                 symbol=symbol,
                 quantity=quantity_to_buy, 
-                side=OrderSide.BUY 
+                side=OrderSide.BUY,
+                return_model=True
             )
             
             if not order_result_trade:
@@ -254,58 +524,35 @@ class AutomatedTradingService:
 
             logger.info(f"BUY {symbol}: Order placement result: {order_result_trade}")
             
-            # 6. Save Trade to DB
-            try:
-                db_trade = DBTrade(
-                    user_id=algorithm.user_id, # Associate with the algorithm's user
-                    signal_id=None, # TODO: Link signal if available?
-                    position_id=None, # TODO: Link position if available?
-                    symbol=order_result_trade.symbol,
-                    quantity=order_result_trade.quantity,
-                    price=order_result_trade.price, # Might be None initially
-                    side=TradeType.BUY, # Use DB enum
-                    status=TradeStatus.PENDING if order_result_trade.status == TradeStatus.PENDING else TradeStatus.FILLED, # Map status
-                    order_id=order_result_trade.order_id, # Should exist if Trade object returned
-                    created_at=order_result_trade.timestamp, # Use timestamp from trade
-                    # filled_at=... # Update later if needed
-                    # additional_data=... 
-                )
-                db.add(db_trade)
-                db.commit()
-                db.refresh(db_trade)
-                trade_saved = True
-                logger.info(f"BUY {symbol}: Saved Trade ID {db_trade.id} to database.")
-            except Exception as db_error:
-                 logger.exception(f"BUY {symbol}: Error saving trade to database: {db_error!r}")
-                 db.rollback() # Rollback DB changes
-                 # Decide if we should re-raise or just log
-
-            # TODO: Update self._positions state after confirmed fill?
+            # 6. Trade for the DB, recorded by the caller as soon as this returns
+            return DBTrade(
+                user_id=algorithm.user_id, # Associate with the algorithm's user
+                signal_id=None, # TODO: Link signal if available?
+                position_id=None, # TODO: Link position if available?
+                symbol=order_result_trade.symbol,
+                quantity=order_result_trade.quantity,
+                price=order_result_trade.price, # Might be None initially
+                side=TradeType.BUY, # Use DB enum
+                status=TradeStatus.PENDING if order_result_trade.status == TradeStatus.PENDING else TradeStatus.FILLED, # Map status
+                order_id=order_result_trade.order_id, # Should exist if Trade object returned
+                created_at=order_result_trade.created_at, # Use timestamp from trade
+                # filled_at=... # Update later if needed
+                # additional_data=... 
+            )
 
         except Exception as e:
             logger.exception(f"Error executing BUY for {symbol} (Algo {algorithm.id}): {e!r}")
-            if not trade_saved: # Rollback if trade wasn't saved before another exception occurred
-                db.rollback()
 
-    async def _execute_sell(self, symbol: str, algorithm: Algorithm, db: Session):
-        """Executes a sell order (closes position) and saves the trade."""
+    async def _execute_sell(self, symbol: str, algorithm: AlgoSpec) -> Optional[DBTrade]:
+        """Executes a sell order (closes position) and returns the trade to save."""
         logger.info(f"Attempting SELL execution for {symbol} (Algo {algorithm.id})")
-        trade_saved = False
         try:
             # 1. Get current position quantity (as before)
-            position_data = self._positions.get(symbol)
-            if not position_data:
+            position = self._positions.get(symbol)
+            if position is None:
                 logger.warning(f"SELL {symbol}: Position data not found in tracked state. Cannot close.")
                 return
-            current_qty_str = position_data.get('qty')
-            if not current_qty_str:
-                 logger.warning(f"SELL {symbol}: Quantity not found in position data: {position_data}. Cannot close.")
-                 return
-            try:
-                current_qty = float(current_qty_str)
-            except ValueError:
-                 logger.warning(f"SELL {symbol}: Invalid quantity format '{current_qty_str}'. Cannot close.")
-                 return
+            current_qty = position.qty
             if current_qty <= 0:
                 logger.warning(f"SELL {symbol}: No position or non-positive quantity ({current_qty}). Skipping close order.")
                 return
@@ -321,32 +568,19 @@ class AutomatedTradingService:
 
             logger.info(f"SELL {symbol}: Close position result: {close_result_trade}")
             
-            # 3. Save Trade to DB
-            try:
-                db_trade = DBTrade(
-                    user_id=algorithm.user_id,
-                    signal_id=None, # TODO: Link signal?
-                    position_id=None, # TODO: Link position?
-                    symbol=close_result_trade.symbol,
-                    quantity=close_result_trade.quantity, # Should be the closed quantity
-                    price=close_result_trade.price, # Filled price
-                    side=TradeType.SELL, # Use DB enum
-                    status=TradeStatus.PENDING if close_result_trade.status == TradeStatus.PENDING else TradeStatus.FILLED,
-                    order_id=close_result_trade.order_id,
-                    created_at=close_result_trade.timestamp,
-                )
-                db.add(db_trade)
-                db.commit()
-                db.refresh(db_trade)
-                trade_saved = True
-                logger.info(f"SELL {symbol}: Saved Trade ID {db_trade.id} to database.")
-            except Exception as db_error:
-                 logger.exception(f"SELL {symbol}: Error saving trade to database: {db_error!r}")
-                 db.rollback()
-
-            # TODO: Update self._positions state after confirmed fill (likely remove symbol)
+            # 3. Trade for the DB, recorded by the caller as soon as this returns
+            return DBTrade(
+                user_id=algorithm.user_id,
+                signal_id=None, # TODO: Link signal?
+                position_id=None, # TODO: Link position?
+                symbol=close_result_trade.symbol,
+                quantity=close_result_trade.quantity, # Should be the closed quantity
+                price=close_result_trade.price, # Filled price
+                side=TradeType.SELL, # Use DB enum
+                status=TradeStatus.PENDING if close_result_trade.status == TradeStatus.PENDING else TradeStatus.FILLED,
+                order_id=close_result_trade.order_id,
+                created_at=close_result_trade.created_at,
+            )
 
         except Exception as e:
-            logger.exception(f"Error executing SELL for {symbol} (Algo {algorithm.id}): {e!r}")
-            if not trade_saved:
-                db.rollback() 
\ No newline at end of file
+            logger.exception(f"Error executing SELL for {symbol} (Algo {algorithm.id}): {e!r}") 
\ No newline at end of file
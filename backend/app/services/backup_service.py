@@ -1,6 +1,7 @@
 import os
-import shutil
+import json
 import sqlite3
+import threading
 import datetime
 import logging
 from typing import Optional, List
@@ -8,10 +9,25 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Tables counted in backup info, keyed by the count's name in the info dict
+BACKUP_COUNT_TABLES = {
+    "algorithm_count": "algorithms",
+    "signal_count": "signals",
+    "position_count": "positions",
+    "trade_count": "trades",
+}
+META_SUFFIX = ".meta.json"
+
 class BackupService:
     def __init__(self, db_path: str, backup_dir: str = "backups"):
         self.db_path = db_path
         self.backup_dir = backup_dir
+        # Sorted backup paths, valid while the directory's mtime is unchanged
+        self._list_cache: Optional[List[str]] = None
+        self._list_cache_mtime: Optional[int] = None
+        # Read-only handle that backups are taken from, opened on first use
+        self._source: Optional[sqlite3.Connection] = None
+        self._source_lock = threading.Lock()
         self._ensure_backup_dir()
 
     def _ensure_backup_dir(self):
@@ -22,24 +38,22 @@ class BackupService:
         """Generate backup filename with timestamp."""
         if timestamp is None:
             timestamp = datetime.datetime.now()
-        return f"trading_db_{timestamp.strftime('%Y%m%d_%H%M%S')}.db"
+        # Microseconds keep names unique for backups taken within the same second;
+        # VACUUM INTO refuses to overwrite an existing file
+        return f"trading_db_{timestamp.strftime('%Y%m%d_%H%M%S_%f')}.db"
 
     def create_backup(self) -> str:
         """Create a backup of the database."""
         try:
-            # Generate backup filename with timestamp
-            backup_filename = self._get_backup_filename()
-            backup_path = os.path.join(self.backup_dir, backup_filename)
-
-            # Create backup using SQLite backup API
-            source = sqlite3.connect(self.db_path)
-            destination = sqlite3.connect(backup_path)
-            
-            with destination:
-                source.backup(destination)
-            
-            source.close()
-            destination.close()
+            # VACUUM INTO writes a compacted snapshot in one pass instead of
+            # copying every page, free ones included, through the backup API
+            with self._source_lock:
+                # Named under the lock so concurrent backups never pick the same file
+                backup_filename = self._get_backup_filename()
+                backup_path = os.path.join(self.backup_dir, backup_filename)
+                self._get_source().execute("VACUUM INTO ?", (backup_path,))
+            self._write_counts(backup_path, self._count_rows(backup_path))
+            self._list_cache = None
 
             logger.info(f"Database backup created: {backup_path}")
             return backup_path
@@ -48,42 +62,33 @@ class BackupService:
             logger.error(f"Error creating database backup: {str(e)}")
             raise
 
+    def _get_source(self) -> sqlite3.Connection:
+        """The reused read-only source connection. synchronous=OFF only affects the
+        snapshot VACUUM INTO writes, which is a fresh file, so it skips the fsyncs."""
+        if self._source is None:
+            self._source = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            self._source.execute("PRAGMA synchronous=OFF")
+        return self._source
+
     def restore_backup(self, backup_path: str) -> None:
         """Restore database from a backup file."""
         try:
             if not os.path.exists(backup_path):
                 raise FileNotFoundError(f"Backup file not found: {backup_path}")
 
-            # Create a temporary backup of current database
-            temp_backup = self._get_backup_filename() + ".temp"
-            temp_backup_path = os.path.join(self.backup_dir, temp_backup)
-            
-            if os.path.exists(self.db_path):
-                shutil.copy2(self.db_path, temp_backup_path)
-
+            # A single-step backup copies inside one write transaction on the
+            # destination, which SQLite rolls back if the copy fails, so the live
+            # database needs no file copy as a safety net. Restoring in place
+            # (rather than renaming files) also keeps open WAL connections valid.
+            source = sqlite3.connect(backup_path)
+            destination = sqlite3.connect(self.db_path)
             try:
-                # Restore from backup
-                source = sqlite3.connect(backup_path)
-                destination = sqlite3.connect(self.db_path)
-                
-                with destination:
-                    source.backup(destination)
-                
+                source.backup(destination)
+            finally:
                 source.close()
                 destination.close()
 
-                logger.info(f"Database restored from backup: {backup_path}")
-                
-                # Remove temporary backup if restore was successful
-                if os.path.exists(temp_backup_path):
-                    os.remove(temp_backup_path)
-
-            except Exception as e:
-                # Restore from temporary backup if something went wrong
-                if os.path.exists(temp_backup_path):
-                    shutil.copy2(temp_backup_path, self.db_path)
-                    os.remove(temp_backup_path)
-                raise
+            logger.info(f"Database restored from backup: {backup_path}")
 
         except Exception as e:
             logger.error(f"Error restoring database backup: {str(e)}")
@@ -92,12 +97,16 @@ class BackupService:
     def list_backups(self) -> List[str]:
         """List all available backups."""
         try:
-            backups = []
-            for file in os.listdir(self.backup_dir):
-                if file.startswith("trading_db_") and file.endswith(".db"):
-                    file_path = os.path.join(self.backup_dir, file)
-                    backups.append(file_path)
-            return sorted(backups, reverse=True)
+            mtime = os.stat(self.backup_dir).st_mtime_ns
+            if self._list_cache is None or mtime != self._list_cache_mtime:
+                with os.scandir(self.backup_dir) as entries:
+                    self._list_cache = sorted(
+                        (entry.path for entry in entries
+                         if entry.name.startswith("trading_db_") and entry.name.endswith(".db") and entry.is_file()),
+                        reverse=True
+                    )
+                self._list_cache_mtime = mtime
+            return list(self._list_cache)
         except Exception as e:
             logger.error(f"Error listing backups: {str(e)}")
             raise
@@ -107,52 +116,60 @@ class BackupService:
         try:
             backups = self.list_backups()
             if len(backups) > keep_last_n:
+                self._list_cache = None
                 for backup in backups[keep_last_n:]:
                     os.remove(backup)
+                    if os.path.exists(backup + META_SUFFIX):
+                        os.remove(backup + META_SUFFIX)
                     logger.info(f"Removed old backup: {backup}")
         except Exception as e:
             logger.error(f"Error cleaning up old backups: {str(e)}")
             raise
 
-    def get_backup_info(self, backup_path: str) -> dict:
-        """Get information about a specific backup."""
+    def _count_rows(self, db_path: str) -> dict:
+        """Row counts of the backed-up tables, in one query."""
+        conn = sqlite3.connect(db_path)
         try:
-            if not os.path.exists(backup_path):
-                raise FileNotFoundError(f"Backup file not found: {backup_path}")
-
-            # Connect to backup database
-            conn = sqlite3.connect(backup_path)
-            cursor = conn.cursor()
-
-            # Get database statistics
-            cursor.execute("SELECT COUNT(*) FROM algorithms")
-            algorithm_count = cursor.fetchone()[0]
-
-            cursor.execute("SELECT COUNT(*) FROM signals")
-            signal_count = cursor.fetchone()[0]
-
-            cursor.execute("SELECT COUNT(*) FROM positions")
-            position_count = cursor.fetchone()[0]
-
-            cursor.execute("SELECT COUNT(*) FROM trades")
-            trade_count = cursor.fetchone()[0]
-
+            counts = conn.execute(
+                "SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {table})" for table in BACKUP_COUNT_TABLES.values())
+            ).fetchone()
+        finally:
             conn.close()
+        return dict(zip(BACKUP_COUNT_TABLES, counts))
+
+    def _write_counts(self, backup_path: str, counts: dict) -> None:
+        with open(backup_path + META_SUFFIX, "w") as f:
+            json.dump(counts, f)
+
+    def get_backup_meta(self, backup_path: str) -> dict:
+        """File information about a backup, without opening it."""
+        if not os.path.exists(backup_path):
+            raise FileNotFoundError(f"Backup file not found: {backup_path}")
+        file_stats = os.stat(backup_path)
+        return {
+            "path": backup_path,
+            "size": file_stats.st_size,
+            "created_at": datetime.datetime.fromtimestamp(file_stats.st_ctime),
+        }
+
+    def get_backup_counts(self, backup_path: str) -> dict:
+        """Row counts for a backup, from the sidecar written at backup time. Backups
+        without one are counted once and get a sidecar."""
+        try:
+            with open(backup_path + META_SUFFIX) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            counts = self._count_rows(backup_path)
+            self._write_counts(backup_path, counts)
+            return counts
 
-            # Get file information
-            file_stats = os.stat(backup_path)
-            created_time = datetime.datetime.fromtimestamp(file_stats.st_ctime)
-
-            return {
-                "path": backup_path,
-                "size": file_stats.st_size,
-                "created_at": created_time,
-                "algorithm_count": algorithm_count,
-                "signal_count": signal_count,
-                "position_count": position_count,
-                "trade_count": trade_count
-            }
+    def get_backup_info(self, backup_path: str) -> dict:
+        """Get information about a specific backup."""
+        try:
+            info = self.get_backup_meta(backup_path)
+            info.update(self.get_backup_counts(backup_path))
+            return info
 
         except Exception as e:
             logger.error(f"Error getting backup info: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
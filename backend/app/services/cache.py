@@ -0,0 +1,103 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class FileCache:
+    """On-disk DataFrame cache, one .npz file per key.
+
+    Each column is stored as a NumPy array and loaded with allow_pickle=False,
+    so reading a file can't run code. Entries carry their own expiry (None =
+    never expires). When the cache grows past max_entries, the least recently
+    read files are evicted. Methods block on file I/O; call them from async
+    code through asyncio.to_thread.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 512):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        return hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data["_meta"].item())
+                expires_at = meta["expires_at"]
+                if expires_at is not None and time.time() >= expires_at:
+                    df = None
+                else:
+                    df = pd.DataFrame({name: data[name] for name in meta["columns"]})
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Dropping unreadable cache file %s: %r", path, e)
+            self._remove(path)
+            return None
+        if df is None:
+            self._remove(path)
+            return None
+        for name, tz in meta["timezones"].items():
+            df[name] = df[name].dt.tz_localize("UTC").dt.tz_convert(tz)
+        os.utime(path)  # Mark as recently used for eviction
+        return df
+
+    def set(self, key: str, df: pd.DataFrame, ttl: Optional[float] = None):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        arrays = {}
+        timezones = {}
+        for name in df.columns:
+            column = df[name]
+            if isinstance(column.dtype, pd.DatetimeTZDtype):
+                timezones[name] = str(column.dt.tz)
+                column = column.dt.tz_convert("UTC").dt.tz_localize(None)
+            values = column.to_numpy()
+            arrays[name] = values.astype(str) if values.dtype == object else values
+        meta = {
+            "expires_at": None if ttl is None else time.time() + ttl,
+            "columns": list(arrays),
+            "timezones": timezones,
+        }
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, _meta=np.array(json.dumps(meta)), **arrays)
+            os.replace(tmp_path, path)  # Readers never see a partial file
+        except Exception as e:
+            logger.warning("Failed to write cache file %s: %r", path, e)
+            self._remove(tmp_path)
+            return
+        self._evict()
+
+    def _evict(self):
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".npz")
+        ]
+        if len(paths) <= self.max_entries:
+            return
+        paths.sort(key=lambda p: max(os.path.getatime(p), os.path.getmtime(p)))
+        for path in paths[:len(paths) - self.max_entries]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
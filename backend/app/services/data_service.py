@@ -1,15 +1,22 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import pandas as pd
 import logging
-from app.services.alpaca_service import AlpacaService
+import time
+from app.services.alpaca_service import AlpacaService, BARS_CACHE_TTL, BARS_CACHE_TTL_BY_TIMEFRAME
 from fastapi import HTTPException
 
 logger = logging.getLogger(__name__)
 
+# Historical frames kept per DataService, least recently used evicted first
+MAX_FRAME_CACHE_ENTRIES = 256
+
 class DataService:
     def __init__(self, alpaca_service: AlpacaService):
         self.alpaca_service = alpaca_service
+        # (symbol, timeframe, lookback_days) -> (frame, monotonic expiry)
+        self._frames: "OrderedDict[Tuple[str, str, int], Tuple[pd.DataFrame, float]]" = OrderedDict()
 
     async def get_historical_data(
         self,
@@ -18,38 +25,51 @@ class DataService:
         end_date: datetime,
         timeframe: str = '1D'
     ) -> pd.DataFrame:
-        """Get historical market data for a symbol."""
+        """Get historical market data for a symbol. Frames are cached per lookback
+        for the timeframe's bars TTL and shared between callers, so treat them as
+        read-only."""
         try:
             # Calculate lookback period
             lookback_days = (end_date - start_date).days
-            print(f"--- Calculated lookback period: {lookback_days} days ---")
+            logger.debug("--- Calculated lookback period: %s days ---", lookback_days)
+            
+            # Rolling lookbacks ending now share a key, unlike the exact start/end
+            key = (symbol, timeframe, lookback_days)
+            cached = self._frames.get(key)
+            if cached is not None:
+                if time.monotonic() < cached[1]:
+                    self._frames.move_to_end(key)
+                    return cached[0]
+                del self._frames[key]
             
-            # Get historical bars from Alpaca
-            bars = await self.alpaca_service.get_historical_bars(
+            # Get historical bars from Alpaca as a typed, timestamp-indexed frame
+            df = await self.alpaca_service.get_bars_frame(
                 symbol=symbol,
                 timeframe=timeframe,
                 lookback_days=lookback_days
             )
             
-            if not bars:
-                print(f"Warning: No bars returned for {symbol}")
+            if df.empty:
+                logger.warning("No bars returned for %s", symbol)
                 return pd.DataFrame()
             
-            print(f"--- Received {len(bars)} bars from Alpaca ---")
+            logger.debug("--- Received %s bars from Alpaca ---", len(df))
             
-            # Create DataFrame from the processed bars
-            df = pd.DataFrame(bars)
-            df.set_index('timestamp', inplace=True)
-            df.sort_index(inplace=True)
+            if not df.index.is_monotonic_increasing:
+                df.sort_index(inplace=True)
             
-            print(f"--- Created DataFrame with shape: {df.shape} ---")
-            print(f"--- DataFrame columns: {df.columns.tolist()} ---")
-            print(f"--- First few rows of DataFrame:\n{df.head()} ---")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("--- Created DataFrame with shape: %s ---", df.shape)
+                logger.debug("--- DataFrame columns: %s ---", df.columns.tolist())
+                logger.debug("--- First few rows of DataFrame:\n%s ---", df.head())
             
+            self._frames[key] = (df, time.monotonic() + BARS_CACHE_TTL_BY_TIMEFRAME.get(timeframe, BARS_CACHE_TTL))
+            if len(self._frames) > MAX_FRAME_CACHE_ENTRIES:
+                self._frames.popitem(last=False)
             return df
             
         except Exception as e:
-            print(f"!!! Error in get_historical_data: {e!r}")
+            logger.error("!!! Error in get_historical_data: %r", e)
             raise HTTPException(status_code=400, detail=str(e))
 
     async def get_latest_price(self, symbol: str) -> Optional[float]:
@@ -61,7 +81,7 @@ class DataService:
                 return float(quote.c)
             return None
         except Exception as e:
-            logger.error(f"Error getting latest price for {symbol}: {str(e)}")
+            logger.error("Error getting latest price for %s: %s", symbol, e)
             return None
 
     async def get_market_status(self) -> bool:
@@ -70,5 +90,5 @@ class DataService:
             clock = await self.alpaca_service.get_clock()
             return clock.is_open
         except Exception as e:
-            logger.error(f"Error getting market status: {str(e)}")
+            logger.error("Error getting market status: %s", e)
             return False 
\ No newline at end of file
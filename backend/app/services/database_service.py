@@ -1,14 +1,85 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import bindparam, func, insert, inspect, select, update
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 from datetime import datetime
 from app.models.db_models import (
     Algorithm, Signal, Position, Trade,
     AlgorithmType, SignalType, PositionStatus, TradeType, TradeStatus
 )
 
+# Cached query results kept per DatabaseService (i.e. per request session)
+MAX_CACHED_QUERIES = 512
+
+# Above this many rows, bulk saves are written with a single executemany INSERT
+BULK_INSERT_THRESHOLD = 100
+
 class DatabaseService:
     def __init__(self, db: Session):
         self.db = db
+        # (query name, *args) -> result; cleared by every write through this service
+        self._cache: Dict[tuple, Any] = {}
+
+    def _cached(self, key: tuple, load: Callable[[], Any]) -> Any:
+        if key in self._cache:
+            return self._cache[key]
+        result = self._cache[key] = load()
+        if len(self._cache) > MAX_CACHED_QUERIES:
+            del self._cache[next(iter(self._cache))]
+        return result
+
+    def _save(self, obj, commit: bool):
+        """Add obj and commit it, or with commit=False only flush it (so its id is
+        assigned) and leave the commit to the caller. The flush's INSERT ... RETURNING
+        already brings back the id and server defaults, so after the commit the
+        object gets those values back instead of a refresh() SELECT."""
+        self._cache.clear()
+        self.db.add(obj)
+        self.db.flush()
+        if commit:
+            state = inspect(obj)
+            loaded = {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+            self.db.commit()
+            for key, value in loaded.items():
+                set_committed_value(obj, key, value)
+        return obj
+
+    def _query(self, model, load: Sequence = ()):
+        """Query for model that selectin-loads the given relationships (e.g.
+        Trade.position), so reading them doesn't issue a SELECT per row."""
+        query = self.db.query(model)
+        if load:
+            query = query.options(*(selectinload(attr) for attr in load))
+        return query
+
+    def _select_columns(self, columns: Sequence, *criteria, page: tuple = (None, None, None)) -> List:
+        """Only the given columns, as read-only mappings; no ORM objects are built."""
+        stmt = self._paginate(select(*columns).where(*criteria), *page)
+        return self.db.execute(stmt).mappings().all()
+
+    @staticmethod
+    def _paginate(query, model, before_id: Optional[int], limit: Optional[int]):
+        """Keyset pagination: newest first, only ids below before_id, at most limit
+        rows. The query is unchanged when neither is given."""
+        if before_id is None and limit is None:
+            return query
+        if before_id is not None:
+            query = query.where(model.id < before_id)
+        query = query.order_by(model.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def _bulk_save(self, model, rows: List[Dict[str, Any]]) -> int:
+        if not rows:
+            return 0
+        self._cache.clear()
+        if len(rows) < BULK_INSERT_THRESHOLD:
+            self.db.add_all([model(**values) for values in rows])
+        else:
+            self.db.execute(insert(model), rows)
+        self.db.commit()
+        return len(rows)
 
     # Algorithm operations
     def create_algorithm(self, symbol: str, type: AlgorithmType, parameters: dict) -> Algorithm:
@@ -17,16 +88,17 @@ class DatabaseService:
             type=type,
             parameters=parameters
         )
-        self.db.add(algorithm)
-        self.db.commit()
-        self.db.refresh(algorithm)
-        return algorithm
+        return self._save(algorithm, True)
 
     def get_algorithm(self, algorithm_id: int) -> Optional[Algorithm]:
-        return self.db.query(Algorithm).filter(Algorithm.id == algorithm_id).first()
+        # Session.get answers from the identity map when the row is already loaded
+        return self.db.get(Algorithm, algorithm_id)
 
-    def get_algorithms_by_symbol(self, symbol: str) -> List[Algorithm]:
-        return self.db.query(Algorithm).filter(Algorithm.symbol == symbol).all()
+    def get_algorithms_by_symbol(self, symbol: str, load: Sequence = ()) -> List[Algorithm]:
+        return self._cached(
+            ('algorithms_by_symbol', symbol, tuple(load)),
+            lambda: self._query(Algorithm, load).filter(Algorithm.symbol == symbol).all()
+        )
 
     # Signal operations
     def create_signal(
@@ -35,7 +107,8 @@ class DatabaseService:
         symbol: str,
         type: SignalType,
         confidence: float,
-        metadata: Optional[dict] = None
+        metadata: Optional[dict] = None,
+        commit: bool = True
     ) -> Signal:
         signal = Signal(
             algorithm_id=algorithm_id,
@@ -44,13 +117,53 @@ class DatabaseService:
             confidence=confidence,
             metadata=metadata
         )
-        self.db.add(signal)
-        self.db.commit()
-        self.db.refresh(signal)
-        return signal
+        return self._save(signal, commit)
+
+    def create_signal_with_prefetch(
+        self,
+        algorithm_id: int,
+        symbol: str,
+        type: SignalType,
+        confidence: float,
+        metadata: Optional[dict] = None
+    ) -> Tuple[Signal, List[Position]]:
+        """Create a signal and return it with the symbol's open positions, which
+        acting on it needs next. The positions stay cached for get_open_positions
+        until the next write."""
+        signal = self.create_signal(algorithm_id, symbol, type, confidence, metadata)
+        return signal, self.get_open_positions(symbol=symbol)
+
+    def bulk_save_signals(self, signals: List[Dict[str, Any]]) -> int:
+        """Save many signals at once (e.g. a historical backfill).
+
+        Each dict uses the Signal column names (algorithm_id, type, symbol,
+        confidence, timestamp, additional_data). Small batches go through the
+        ORM; large ones skip per-object bookkeeping and are sent as one
+        executemany INSERT.
+        """
+        return self._bulk_save(Signal, signals)
 
-    def get_signals_by_algorithm(self, algorithm_id: int) -> List[Signal]:
-        return self.db.query(Signal).filter(Signal.algorithm_id == algorithm_id).all()
+    def get_signals_by_algorithm(
+        self,
+        algorithm_id: int,
+        load: Sequence = (),
+        columns: Optional[Sequence] = None,
+        before_id: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List:
+        """Signals of an algorithm, or with columns (e.g. Signal.id, Signal.type) just
+        those columns as mappings. With before_id/limit, one page, newest first;
+        pass the last id seen as before_id for the next page."""
+        page = (Signal, before_id, limit)
+        if columns:
+            return self._cached(
+                ('signal_columns_by_algorithm', algorithm_id, tuple(columns), before_id, limit),
+                lambda: self._select_columns(columns, Signal.algorithm_id == algorithm_id, page=page)
+            )
+        return self._cached(
+            ('signals_by_algorithm', algorithm_id, tuple(load), before_id, limit),
+            lambda: self._paginate(self._query(Signal, load).filter(Signal.algorithm_id == algorithm_id), *page).all()
+        )
 
     # Position operations
     def create_position(
@@ -67,13 +180,9 @@ class DatabaseService:
             entry_price=entry_price,
             current_price=current_price,
             status=PositionStatus.OPEN,
-            entry_time=datetime.utcnow(),
             metadata=metadata
         )
-        self.db.add(position)
-        self.db.commit()
-        self.db.refresh(position)
-        return position
+        return self._save(position, True)
 
     def update_position(
         self,
@@ -83,6 +192,7 @@ class DatabaseService:
     ) -> Optional[Position]:
         position = self.db.query(Position).filter(Position.id == position_id).first()
         if position:
+            self._cache.clear()
             position.current_price = current_price
             if status:
                 position.status = status
@@ -90,8 +200,27 @@ class DatabaseService:
             self.db.refresh(position)
         return position
 
-    def get_open_positions(self) -> List[Position]:
-        return self.db.query(Position).filter(Position.status == PositionStatus.OPEN).all()
+    def bulk_save_positions(self, positions: List[Dict[str, Any]]) -> int:
+        """Save many positions at once; dicts use the Position column names."""
+        return self._bulk_save(Position, positions)
+
+    def get_open_positions(
+        self,
+        load: Sequence = (),
+        columns: Optional[Sequence] = None,
+        symbol: Optional[str] = None
+    ) -> List:
+        """Open positions, optionally for one symbol, or with columns just those
+        columns as mappings."""
+        criteria = [Position.status == PositionStatus.OPEN]
+        if symbol is not None:
+            criteria.append(Position.symbol == symbol)
+        if columns:
+            return self._select_columns(columns, *criteria)
+        return self._cached(
+            ('open_positions', symbol, tuple(load)),
+            lambda: self._query(Position, load).filter(*criteria).all()
+        )
 
     # Trade operations
     def create_trade(
@@ -103,7 +232,8 @@ class DatabaseService:
         order_id: str,
         signal_id: Optional[int] = None,
         position_id: Optional[int] = None,
-        metadata: Optional[dict] = None
+        metadata: Optional[dict] = None,
+        commit: bool = True
     ) -> Trade:
         trade = Trade(
             symbol=symbol,
@@ -116,10 +246,7 @@ class DatabaseService:
             position_id=position_id,
             metadata=metadata
         )
-        self.db.add(trade)
-        self.db.commit()
-        self.db.refresh(trade)
-        return trade
+        return self._save(trade, commit)
 
     def update_trade_status(
         self,
@@ -129,6 +256,7 @@ class DatabaseService:
     ) -> Optional[Trade]:
         trade = self.db.query(Trade).filter(Trade.order_id == order_id).first()
         if trade:
+            self._cache.clear()
             trade.status = status
             if filled_at:
                 trade.filled_at = filled_at
@@ -136,8 +264,41 @@ class DatabaseService:
             self.db.refresh(trade)
         return trade
 
-    def get_trades_by_position(self, position_id: int) -> List[Trade]:
-        return self.db.query(Trade).filter(Trade.position_id == position_id).all()
+    def bulk_update_trade_status(self, updates: List[Dict[str, Any]]) -> int:
+        """Apply many order status updates (e.g. a broker reconciliation) with one
+        executemany UPDATE and one commit. Each dict has order_id, status and
+        optionally filled_at; as in update_trade_status, a missing filled_at keeps
+        the stored one. Returns the number of trades updated."""
+        if not updates:
+            return 0
+        self._cache.clear()
+        trades = Trade.__table__
+        stmt = (
+            update(trades)
+            .where(trades.c.order_id == bindparam('_order_id'))
+            .values(status=bindparam('status'), filled_at=func.coalesce(bindparam('filled_at'), trades.c.filled_at))
+        )
+        result = self.db.execute(stmt, [
+            {'_order_id': u['order_id'], 'status': u['status'], 'filled_at': u.get('filled_at')}
+            for u in updates
+        ])
+        self.db.commit()
+        return result.rowcount
+
+    def bulk_save_trades(self, trades: List[Dict[str, Any]]) -> int:
+        """Save many trades at once; dicts use the Trade column names."""
+        return self._bulk_save(Trade, trades)
+
+    def get_trades_by_position(
+        self,
+        position_id: int,
+        load: Sequence = (),
+        before_id: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Trade]:
+        """Trades of a position; before_id/limit page through them as in get_signals_by_algorithm."""
+        query = self._query(Trade, load).filter(Trade.position_id == position_id)
+        return self._paginate(query, Trade, before_id, limit).all()
 
-    def get_trades_by_signal(self, signal_id: int) -> List[Trade]:
-        return self.db.query(Trade).filter(Trade.signal_id == signal_id).all() 
\ No newline at end of file
+    def get_trades_by_signal(self, signal_id: int, load: Sequence = ()) -> List[Trade]:
+        return self._query(Trade, load).filter(Trade.signal_id == signal_id).all() 
\ No newline at end of file
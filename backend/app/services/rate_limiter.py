@@ -0,0 +1,52 @@
+import asyncio
+import math
+import time
+from typing import Dict, Tuple
+
+class TokenBucketLimiter:
+    """In-process token bucket per client key.
+
+    acquire() never awaits, so on the event loop each check-and-take is
+    atomic without a lock.
+    """
+
+    def __init__(self, capacity: int, period_seconds: float, max_keys: int = 10000):
+        self.capacity = float(capacity)
+        self.period_seconds = period_seconds
+        self.refill_rate = capacity / period_seconds  # Tokens per second
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, last refill time)
+
+    def acquire(self, key: str) -> Tuple[bool, int]:
+        """Take one token for key. Returns (allowed, retry_after_seconds)."""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - last) * self.refill_rate)
+        if tokens >= 1.0:
+            if key not in self._buckets and len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = (tokens - 1.0, now)
+            return True, 0
+        self._buckets[key] = (tokens, now)
+        return False, math.ceil((1.0 - tokens) / self.refill_rate)
+
+    async def wait(self, key: str):
+        """Take one token for key, sleeping until one is available."""
+        while True:
+            allowed, _ = self.acquire(key)
+            if allowed:
+                return
+            tokens, _ = self._buckets[key]
+            await asyncio.sleep((1.0 - tokens) / self.refill_rate)
+
+    def _prune(self, now: float):
+        """Drop buckets that have refilled completely; they carry no state."""
+        full_after = self.period_seconds
+        self._buckets = {
+            key: (tokens, last)
+            for key, (tokens, last) in self._buckets.items()
+            if now - last < full_after
+        }
+
+    def describe(self) -> str:
+        return f"{int(self.capacity)} per {int(self.period_seconds)} seconds"
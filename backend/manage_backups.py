@@ -8,26 +8,26 @@ def main():
 
     # Create backup command
     create_parser = subparsers.add_parser("create", help="Create a new backup")
-    create_parser.set_defaults(func=lambda args: create_backup(args))
+    create_parser.set_defaults(func=create_backup)
 
     # Restore backup command
     restore_parser = subparsers.add_parser("restore", help="Restore from a backup")
     restore_parser.add_argument("backup_path", help="Path to the backup file")
-    restore_parser.set_defaults(func=lambda args: restore_backup(args))
+    restore_parser.set_defaults(func=restore_backup)
 
     # List backups command
     list_parser = subparsers.add_parser("list", help="List available backups")
-    list_parser.set_defaults(func=lambda args: list_backups(args))
+    list_parser.set_defaults(func=list_backups)
 
     # Cleanup backups command
     cleanup_parser = subparsers.add_parser("cleanup", help="Cleanup old backups")
     cleanup_parser.add_argument("--keep", type=int, default=5, help="Number of backups to keep")
-    cleanup_parser.set_defaults(func=lambda args: cleanup_backups(args))
+    cleanup_parser.set_defaults(func=cleanup_backups)
 
     # Info command
     info_parser = subparsers.add_parser("info", help="Get information about a backup")
     info_parser.add_argument("backup_path", help="Path to the backup file")
-    info_parser.set_defaults(func=lambda args: get_backup_info(args))
+    info_parser.set_defaults(func=get_backup_info)
 
     args = parser.parse_args()
     
@@ -35,20 +35,18 @@ def main():
         parser.print_help()
         sys.exit(1)
     
-    args.func(args)
+    # One service for the command, so its source connection and listing cache are shared
+    args.func(BackupService("trading.db"), args)
 
-def create_backup(args):
-    backup_service = BackupService("trading.db")
+def create_backup(backup_service: BackupService, args):
     backup_path = backup_service.create_backup()
     print(f"Backup created successfully: {backup_path}")
 
-def restore_backup(args):
-    backup_service = BackupService("trading.db")
+def restore_backup(backup_service: BackupService, args):
     backup_service.restore_backup(args.backup_path)
     print(f"Database restored from backup: {args.backup_path}")
 
-def list_backups(args):
-    backup_service = BackupService("trading.db")
+def list_backups(backup_service: BackupService, args):
     backups = backup_service.list_backups()
     
     if not backups:
@@ -65,13 +63,11 @@ def list_backups(args):
               f"{info['position_count']} positions, {info['trade_count']} trades")
         print()
 
-def cleanup_backups(args):
-    backup_service = BackupService("trading.db")
+def cleanup_backups(backup_service: BackupService, args):
     backup_service.cleanup_old_backups(args.keep)
     print(f"Cleanup completed. Kept the {args.keep} most recent backups.")
 
-def get_backup_info(args):
-    backup_service = BackupService("trading.db")
+def get_backup_info(backup_service: BackupService, args):
     info = backup_service.get_backup_info(args.backup_path)
     
     print(f"Backup Information for {args.backup_path}:")
@@ -11,4 +11,7 @@ from .app.main import app
 # You might need to add uvicorn run logic here if it's not handled elsewhere
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # loop="auto" and http="auto" run on uvloop and httptools whenever they are
+    # installed (see requirements.txt). Keep a single worker: the automated trading
+    # loop and its state live in this process, so extra workers would each trade.
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="auto", http="auto") 
\ No newline at end of file
@@ -0,0 +1,14 @@
+import os
+import pytest_asyncio
+from dotenv import load_dotenv
+from app.services.alpaca_service import AlpacaService
+
+# Load environment variables
+load_dotenv()
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def alpaca():
+    """One AlpacaService for the whole run, so its HTTP connections stay open between tests."""
+    service = AlpacaService(api_key_id=os.getenv("APCA_API_KEY_ID"), secret_key=os.getenv("APCA_API_SECRET_KEY"))
+    yield service
+    await service.aclose()
@@ -1,3 +1,4 @@
+import orjson
 import pytest
 from datetime import datetime, timedelta, timezone
 from app.services.alpaca_service import AlpacaService
@@ -7,12 +8,9 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-@pytest.mark.asyncio
-async def test_get_historical_bars():
-    # Initialize Alpaca service
-    api_key = os.getenv("APCA_API_KEY_ID")
-    secret_key = os.getenv("APCA_API_SECRET_KEY")
-    service = AlpacaService(api_key_id=api_key, secret_key=secret_key)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_historical_bars(alpaca):
+    service = alpaca
     
     # Test with AAPL using a date range from last month
     symbol = "AAPL"
@@ -48,6 +46,57 @@ async def test_get_historical_bars():
     except Exception as e:
         pytest.fail(f"Error in get_historical_bars: {str(e)}")
 
+class FakeBarsResponse:
+    def __init__(self, payload):
+        self.content = orjson.dumps(payload)
+
+def fake_bars_api(counts):
+    """Stand-in for _get_with_retry that pages like the data API: `limit` caps bars
+    across all symbols, and bars come grouped by symbol in `sort` order."""
+    start = datetime(2024, 1, 2, 14, 30, tzinfo=timezone.utc)
+    requests = []
+
+    async def get_with_retry(self, path, params=None, bucket='trading'):
+        requests.append(dict(params))
+        rows = []
+        for sym in params["symbols"].split(","):
+            sym_rows = [
+                (sym, {"t": (start + timedelta(minutes=5 * i)).isoformat(), "o": i, "h": i, "l": i, "c": i, "v": 1})
+                for i in range(counts.get(sym, 0))
+            ]
+            rows.extend(reversed(sym_rows) if params.get("sort") == "desc" else sym_rows)
+        offset = int(params.get("page_token") or 0)
+        end = offset + params["limit"]
+        bars = {}
+        for sym, bar in rows[offset:end]:
+            bars.setdefault(sym, []).append(bar)
+        return FakeBarsResponse({"bars": bars, "next_page_token": str(end) if end < len(rows) else None})
+
+    return get_with_retry, requests
+
+@pytest.mark.asyncio
+async def test_multi_symbol_bars_keep_the_newest_bars_of_every_symbol(monkeypatch):
+    counts = {"AAA": 3000, "BBB": 3000, "CCC": 3000, "DDD": 10}
+    get_with_retry, requests = fake_bars_api(counts)
+    monkeypatch.setattr(AlpacaService, "_get_with_retry", get_with_retry)
+    service = AlpacaService(api_key_id="key", secret_key="secret")
+    try:
+        bars = await service.get_historical_bars(list(counts), timeframe="5Min", lookback_days=30, limit=1000)
+        multi_requests = len(requests)
+        single = await service.get_historical_bars("BBB", timeframe="1H", lookback_days=30, limit=1000)
+    finally:
+        await service.aclose()
+
+    assert set(bars) == set(counts)
+    for sym in ("AAA", "BBB", "CCC"):
+        closes = [bar["close"] for bar in bars[sym]]
+        assert closes == list(range(2000, 3000)), sym  # Newest 1000, oldest first
+    assert [bar["close"] for bar in bars["DDD"]] == list(range(10))
+    assert [bar["close"] for bar in single] == list(range(2000, 3000))
+    assert len(requests) == multi_requests + 1  # One symbol fills its limit from the first page
+
 if __name__ == "__main__":
     import asyncio
-    asyncio.run(test_get_historical_bars()) 
\ No newline at end of file
+    asyncio.run(test_get_historical_bars(
+        AlpacaService(api_key_id=os.getenv("APCA_API_KEY_ID"), secret_key=os.getenv("APCA_API_SECRET_KEY"))
+    ))
\ No newline at end of file
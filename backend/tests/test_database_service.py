@@ -0,0 +1,110 @@
+import contextlib
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.models.db_models import (
+    Base, Algorithm, Signal, Position, Trade,
+    AlgorithmType, SignalType, PositionStatus, TradeType, TradeStatus
+)
+from app.services.database_service import DatabaseService
+
+@contextlib.contextmanager
+def count_queries(engine):
+    """Collect the SQL statements engine runs inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def service(engine):
+    with sessionmaker(bind=engine)() as db:
+        algorithm = Algorithm(symbol="AAPL", type=AlgorithmType.RSI, parameters={})
+        db.add(algorithm)
+        db.flush()
+        signals = [
+            Signal(algorithm_id=algorithm.id, symbol="AAPL", type=SignalType.BUY, confidence=0.5)
+            for _ in range(5)
+        ]
+        position = Position(symbol="AAPL", quantity=1.0, entry_price=1.0, current_price=1.0, status=PositionStatus.OPEN)
+        db.add_all([*signals, position])
+        db.flush()
+        db.add_all([
+            Trade(symbol="AAPL", quantity=1.0, price=1.0, side=TradeType.BUY, status=TradeStatus.PENDING,
+                  order_id=str(i), signal_id=signal.id, position_id=position.id)
+            for i, signal in enumerate(signals)
+        ])
+        db.commit()
+        db.expunge_all()
+        yield DatabaseService(db)
+
+def test_trades_by_position_eager_loads_relationships(engine, service):
+    with count_queries(engine) as queries:
+        trades = service.get_trades_by_position(1, load=(Trade.position, Trade.signal))
+        for trade in trades:
+            trade.position.symbol
+            trade.signal.type
+    assert len(trades) == 5
+    assert len(queries) == 3  # Trades, then one selectin query per relationship
+
+def test_signals_by_algorithm_eager_loads_algorithm(engine, service):
+    with count_queries(engine) as queries:
+        for signal in service.get_signals_by_algorithm(1, load=(Signal.algorithm,)):
+            signal.algorithm.symbol
+    assert len(queries) == 2
+
+def test_repeated_lookups_hit_the_service_cache(engine, service):
+    with count_queries(engine) as queries:
+        service.get_signals_by_algorithm(1)
+        service.get_signals_by_algorithm(1)
+        service.get_algorithms_by_symbol("AAPL")
+        service.get_algorithms_by_symbol("AAPL")
+        service.get_algorithm(1)  # Already in the identity map
+    assert len(queries) == 2
+
+def test_writes_clear_the_service_cache(engine, service):
+    assert len(service.get_signals_by_algorithm(1)) == 5
+    service.bulk_save_signals([dict(algorithm_id=1, symbol="AAPL", type=SignalType.SELL, confidence=0.5)])
+    assert len(service.get_signals_by_algorithm(1)) == 6
+
+def test_bulk_update_trade_status_uses_one_executemany(engine, service):
+    filled_at = datetime(2024, 1, 2, 3, 4, 5)
+    service.update_trade_status("0", TradeStatus.FILLED, filled_at)
+    with count_queries(engine) as queries:
+        updated = service.bulk_update_trade_status([
+            dict(order_id="0", status=TradeStatus.CANCELLED),  # No filled_at: the stored one is kept
+            dict(order_id="1", status=TradeStatus.FILLED, filled_at=filled_at),
+            dict(order_id="missing", status=TradeStatus.FILLED),
+        ])
+    assert len(queries) == 1 and queries[0].startswith("UPDATE trades")
+    assert updated == 2
+    trades = {trade.order_id: trade for trade in service.get_trades_by_position(1)}
+    assert trades["0"].status == TradeStatus.CANCELLED and trades["0"].filled_at == filled_at
+    assert trades["1"].status == TradeStatus.FILLED and trades["1"].filled_at == filled_at
+    assert trades["2"].status == TradeStatus.PENDING and trades["2"].filled_at is None
+
+def test_create_reads_generated_values_without_a_refresh(engine, service):
+    with count_queries(engine) as queries:
+        trade = service.create_trade("AAPL", 1.0, 1.0, TradeType.BUY, order_id="new")
+        trade.id, trade.created_at
+    assert len(queries) == 1 and queries[0].startswith("INSERT INTO trades")
+    with count_queries(engine) as queries:
+        position = service.create_position("AAPL", 1.0, 1.0, 1.0)
+        position.id, position.entry_time
+    assert len(queries) == 1 and queries[0].startswith("INSERT INTO positions")
+    assert trade.id and trade.created_at and position.id and position.entry_time
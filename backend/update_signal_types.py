@@ -10,13 +10,15 @@ def update_signal_types():
         conn = sqlite3.connect('trading.db')
         cursor = conn.cursor()
         
-        # Update lowercase values to uppercase
-        cursor.execute("UPDATE signals SET type = 'BUY' WHERE type = 'buy'")
-        cursor.execute("UPDATE signals SET type = 'SELL' WHERE type = 'sell'")
-        cursor.execute("UPDATE signals SET type = 'HOLD' WHERE type = 'hold'")
+        # Update lowercase values to uppercase, in one pass over the table
+        cursor.execute(
+            "UPDATE signals SET type = upper(type) WHERE type IN ('buy', 'sell', 'hold')"
+        )
         
         # Commit the changes
         conn.commit()
+        # Fold the rewritten pages back into the database so the WAL doesn't stay large
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
         logger.info("Successfully updated signal types in the database")
         
     except Exception as e: